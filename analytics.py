@@ -1,66 +1,215 @@
 import discord
 import io
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
-from typing import List, Dict, Any
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
 from config import CONFIG
 from utils import clean_name
 
-def get_leaderboard_stats(guild: discord.Guild, cache: Dict[str, Any]) -> List[Dict[str, Any]]:
+# matplotlib (and numpy, for the graphs) are imported on first use: only the render workers draw,
+# so the bot process itself never pays for them at startup.
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def prewarm() -> bytes:
+    """Render-worker warm-up job: pays the matplotlib import before the first real graph."""
+    _pyplot()
+    return b""
+
+# Rows per leaderboard page: a full page stays well under Discord's 2000-character message limit
+LEADERBOARD_PAGE_SIZE = 20
+# Rendered season leaderboard pages: (cache tag, page) -> text. Stale versions are dropped by invalidate_pages.
+_pages: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+PAGE_CACHE_SIZE = 256
+
+def qualifying_games(window_games: int) -> int:
+    """MIN_GAMES for the season; a short window (a week, a month) only asks for half its games."""
+    if window_games is None: return CONFIG["MIN_GAMES"]
+    return min(CONFIG["MIN_GAMES"], max(1, window_games // 2))
+
+def get_leaderboard_stats(guild: discord.Guild, cache: Dict[str, Any],
+                          window: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+    """Leaderboard rows for the whole season, or for game rows [lo, hi) (see ScoreMatrix.rows_between)."""
+    matrix = cache.matrix
     stats_list = []
     
-    for uid, stats in cache["players"].items():
-        if stats["games_played"] < CONFIG["MIN_GAMES"]: continue
-        
-        avg = stats["total_score"] / stats["games_played"]
-        win_rate = (stats["wins"] / stats["games_played"]) * 100
-        
-        user = guild.get_member(int(uid))
-        real_name = user.display_name if user else f"ID: {uid}"
-        
-        stats_list.append({
-            'name': clean_name(real_name),
-            'full_name': real_name,
-            'avg': avg,
-            'win_rate': win_rate,
-            'war': stats["total_war"],
-            'games': stats["games_played"]
-        })
+    lo, hi = window or (0, matrix.n_games)
+    totals = matrix.window(lo, hi)
+    games, wins, wars = totals["games"], totals["wins"], totals["war"]
+    min_games = qualifying_games(hi - lo if window else None)
+    
+    for col in (games >= min_games).nonzero()[0]:
+        stats_list.append(_leaderboard_row(guild, matrix.uids[col], games[col], totals["score"][col], wins[col], wars[col]))
 
     stats_list.sort(key=lambda x: x['war'], reverse=True)
     return stats_list
 
-# Notice we now pass the whole cache instead of just an integer
-def render_leaderboard_table(stats_list: List[Dict[str, Any]], cache: Dict[str, Any]) -> str:
-    if not stats_list:
-        return (f"**📊 OFFICIAL WORDLE ANALYTICS**\n"
-                f"*{CONFIG['SEASON_NAME']} Data*\n\n"
-                f"⚠️ **Not enough data yet.**\n"
-                f"Players need at least {CONFIG['MIN_GAMES']} games to qualify.")
+def get_standings_stats(guild: discord.Guild, standings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Leaderboard rows for an archived season, straight from its precomputed final standings."""
+    return [_leaderboard_row(guild, s['uid'], s['games'], s['score'], s['wins'], s['war'])
+            for s in standings if s['games'] >= CONFIG["MIN_GAMES"]]
 
-    # Get the streak out of the cache!
-    streak_number = cache.get("current_streak", len(cache["games"]))
+def _member_name(guild: discord.Guild, uid: str) -> str:
+    user = guild.get_member(int(uid))
+    return user.display_name if user else f"ID: {uid}"
+
+def _leaderboard_row(guild: discord.Guild, uid: str, games, score, wins, war) -> Dict[str, Any]:
+    real_name = _member_name(guild, uid)
+    
+    return {
+        'uid': uid,
+        'name': clean_name(real_name),
+        'full_name': real_name,
+        'avg': float(score / games),
+        'win_rate': float((wins / games) * 100),
+        'war': float(war),
+        'games': int(games)
+    }
+
+def leaderboard_pages(players: int) -> int:
+    return max(1, -(-players // LEADERBOARD_PAGE_SIZE))
+
+def _clamp_page(page: int, pages: int) -> int:
+    return min(max(page, 0), pages - 1)
+
+def _empty_table(season: str, period: Optional[str] = None, window_games: Optional[int] = None) -> str:
+    return (f"**📊 OFFICIAL WORDLE ANALYTICS**\n"
+            f"*{season} Data{f' · {period}' if period else ''}*\n\n"
+            + ("⚠️ **No games in this period.**" if period and not window_games else
+               f"⚠️ **Not enough data yet.**\n"
+               f"Players need at least {qualifying_games(window_games)} games to qualify."))
 
+def _render_table(rows: List[Dict[str, Any]], first_rank: int, season: str, subtitle: str,
+                  mvp: str, lvp: str, page: int, pages: int) -> str:
     header = f"{'RK':<3} {'NAME':<14} {'AVG':<5} {'WIN%':<5} {'WAR':<6} {'GAMES'}"
     table_lines = [header, "=" * len(header)]
     
-    for i, p in enumerate(stats_list, 1):
+    for i, p in enumerate(rows, first_rank):
         name_display = (p['name'][:12] + '..') if len(p['name']) > 12 else p['name']
         line = f"#{i:<2} {name_display:<14} {p['avg']:.2f}  {p['win_rate']:.0f}%   {p['war']:+.1f}   {p['games']}"
         table_lines.append(line)
 
     return (f"**📊 OFFICIAL WORDLE ANALYTICS**\n"
-            f"*{CONFIG['SEASON_NAME']} Data ({streak_number}-Day Streak)*\n\n"
+            f"*{season} Data ({subtitle})*\n\n"
             f"```text\n" + "\n".join(table_lines) + "\n```\n"
-            f"👑 **MVP:** {stats_list[0]['full_name']}\n"
-            f"💀 **LVP:** {stats_list[-1]['full_name']}")
+            f"👑 **MVP:** {mvp}\n"
+            f"💀 **LVP:** {lvp}"
+            + (f"\n📄 Page {page + 1}/{pages}" if pages > 1 else ""))
 
-def generate_war_graph(user_name: str, war_history: List[float]) -> discord.File:
+def _streak_subtitle(cache: Dict[str, Any]) -> str:
+    # Get the streak out of the cache!
+    streak_number = cache.get("current_streak", len(cache["games"]))
+    return f"{streak_number}-Day Streak"
+
+# Notice we now pass the whole cache instead of just an integer
+def render_leaderboard_table(stats_list: List[Dict[str, Any]], cache: Dict[str, Any],
+                             period: Optional[str] = None, window_games: Optional[int] = None,
+                             season: Optional[str] = None, page: int = 0) -> str:
+    """One page (LEADERBOARD_PAGE_SIZE rows) of an already computed leaderboard."""
+    season = season or CONFIG['SEASON_NAME']
+    if not stats_list:
+        return _empty_table(season, period, window_games)
+
+    subtitle = f"{period}, {window_games} games" if period else _streak_subtitle(cache)
+    pages = leaderboard_pages(len(stats_list))
+    page = _clamp_page(page, pages)
+    start = page * LEADERBOARD_PAGE_SIZE
+    return _render_table(stats_list[start:start + LEADERBOARD_PAGE_SIZE], start + 1, season, subtitle,
+                         stats_list[0]['full_name'], stats_list[-1]['full_name'], page, pages)
+
+def render_season_page(guild: discord.Guild, cache: Dict[str, Any], page: int = 0) -> Tuple[str, int]:
+    """
+    (text, page count) for one page of the current season's leaderboard, read off the matrix's
+    maintained WAR ranking: only that page's players are looked up, and each rendered page is
+    cached until the cache version changes.
+    """
+    matrix = cache.matrix
+    pages = leaderboard_pages(matrix.n_ranked)
+    page = _clamp_page(page, pages)
+    key = (cache.tag, page)
+    text = _pages.get(key)
+    if text is not None:
+        _pages.move_to_end(key)
+        return text, pages
+
+    if not matrix.n_ranked:
+        text = _empty_table(CONFIG['SEASON_NAME'])
+    else:
+        start = page * LEADERBOARD_PAGE_SIZE
+        rows = [_leaderboard_row(guild, uid, *matrix.player_totals(uid))
+                for uid in matrix.ranked(start, start + LEADERBOARD_PAGE_SIZE)]
+        text = _render_table(rows, start + 1, CONFIG['SEASON_NAME'], _streak_subtitle(cache),
+                             _member_name(guild, matrix.ranked(0, 1)[0]), _member_name(guild, matrix.ranked(-1)[0]),
+                             page, pages)
+    _pages[key] = text
+    while len(_pages) > PAGE_CACHE_SIZE:
+        _pages.popitem(last=False)
+    return text, pages
+
+def invalidate_pages(scope: str, version: int):
+    """data change listener: drops the rendered pages of older versions of that shard."""
+    stale, current = f"{scope}.v", f"{scope}.v{version}"
+    for key in [k for k in _pages if k[0].startswith(stale) and k[0] != current]:
+        del _pages[key]
+
+# --- Game difficulty (read off the matrix's per-game aggregates) ---
+SPARK = " ▁▂▃▄▅▆▇█"
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def _sparkline(histogram: List[int]) -> str:
+    """One block per bucket (1..6, X), scaled to the fullest bucket."""
+    top = max(histogram) or 1
+    return "".join(SPARK[-(-count * (len(SPARK) - 1) // top)] for count in histogram)
+
+def render_game_line(cache: Dict[str, Any], row: int) -> str:
+    """One-line summary of a game, e.g. for the daily recap reply."""
+    game = cache.matrix.game_summary(row)
+    return (f"🎯 **Game {row + 1}:** avg {game['mean']:.2f}, {game['participants']} played, "
+            f"{game['fails']} failed · {_ordinal(game['rank'])} hardest of {cache.matrix.n_games}")
+
+def render_difficulty_table(cache: Dict[str, Any], rows: List[int], hardest: bool = True) -> str:
+    title = "HARDEST" if hardest else "EASIEST"
+    if not rows:
+        return f"**🧩 {title} DAYS**\n\n⚠️ **No games yet.**"
+
+    header = f"{'GAME':<5} {'DATE':<7} {'AVG':<5} {'PLAYED':<6} {'FAILS':<5} {'1-6,X'}"
+    table_lines = [header, "=" * len(header)]
+    for row in rows:
+        game = cache.matrix.game_summary(row)
+        date = datetime.fromtimestamp(game['date'], CONFIG["TZ"]).strftime("%b %d")
+        table_lines.append(f"#{row + 1:<4} {date:<7} {game['mean']:<5.2f} {game['participants']:<6} "
+                           f"{game['fails']:<5} {_sparkline(game['histogram'])}")
+
+    return (f"**🧩 {title} DAYS**\n"
+            f"*{CONFIG['SEASON_NAME']} Data ({cache.matrix.n_games} games, ranked by server average)*\n\n"
+            f"```text\n" + "\n".join(table_lines) + "\n```")
+
+# THE FIX: Expanded to 10 highly distinct colors for "Compare All" scenarios
+COLORS = [
+    '#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd', 
+    '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
+]
+
+def _to_png(fig) -> bytes:
+    plt = _pyplot()
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+def generate_war_graph(user_name: str, war_history: List[float]) -> bytes:
     """
     Generates a beautiful matplotlib graph of a player's WAR history.
+    Runs inside a render worker: takes plain data, returns PNG bytes.
     """
+    import numpy as np
+    plt = _pyplot()
     dates = list(range(1, len(war_history) + 1))
     
     plt.style.use('bmh')
@@ -83,79 +232,73 @@ def generate_war_graph(user_name: str, war_history: List[float]) -> discord.File
     ax.text(0.02, 0.95, stats_text, transform=ax.transAxes, 
             verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    plt.close(fig)
-    return discord.File(buf, filename=f"{clean_name(user_name)}_war.png")
+    return _to_png(fig)
 
-def generate_comparison_graph(guild: discord.Guild, cache: Dict[str, Any], uids: List[str]) -> discord.File:
+def build_comparison_series(cache: Dict[str, Any], uids: List[str], names: Dict[str, str]) -> Tuple[List[Dict[str, Any]], int]:
     """
-    Generates a beautiful, chronological multi-line graph comparing players.
-    Uses continuous lines without individual dots, and gray dotted AFK flatlines.
-    Ensures 100% math accuracy using Game Index.
+    Turns the score matrix into plain per-player series (name, color, played days, WAR)
+    that can be shipped to a render worker.
+    Ensures 100% math accuracy using Game Index (day number = matrix row + 1).
     """
-    player_timelines = {uid: {} for uid in uids}
-    current_war = {uid: 0.0 for uid in uids}
-
-    # Data aggregation using Game Index (guarantees accuracy)
-    for index, game in enumerate(cache['games']):
-        day_number = index + 1 
+    matrix = cache.matrix
+    series = []
+    for idx, uid in enumerate(uids):
+        rows, wars = matrix.timeline(uid)
+        if not len(rows): continue
         
-        scores = list(game['scores'].values())
-        if not scores: continue
-        day_avg = sum(scores) / len(scores)
+        series.append({
+            'name': names[uid],
+            # Cycle through our defined colors
+            'color': COLORS[idx % len(COLORS)],
+            'days': (rows + 1).tolist(),
+            'wars': wars.tolist()
+        })
 
-        for uid in uids:
-            if uid in game['scores']:
-                score = game['scores'][uid]
-                current_war[uid] += (day_avg - score)
-                player_timelines[uid][day_number] = current_war[uid]
+    return series, matrix.n_games
 
+def generate_comparison_graph(series: List[Dict[str, Any]], max_overall_day: int) -> bytes:
+    """
+    Generates a beautiful, chronological multi-line graph comparing players.
+    Uses continuous lines without individual dots, and gray dotted AFK flatlines.
+    Runs inside a render worker: takes plain data, returns PNG bytes.
+    """
+    import numpy as np
+    plt = _pyplot()
     # Start Drawing - Setup Aesthetics
     # Use 'seaborn-v0_8-notebook' or 'bmh' style for a modern look
     plt.style.use('bmh')
     fig, ax = plt.subplots(figsize=(12, 7))
-    # Start Drawing - Setup Aesthetics
-    plt.style.use('bmh')
-    fig, ax = plt.subplots(figsize=(12, 7))
-    
-    # THE FIX: Expanded to 10 highly distinct colors for "Compare All" scenarios
-    colors = [
-        '#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd', 
-        '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
-    ]
-    
-    max_overall_day = len(cache['games'])
 
-    for idx, uid in enumerate(uids):
-        user = guild.get_member(int(uid))
-        name = user.display_name if user else f"Player {uid}"
-        # Cycle through our defined colors
-        color = colors[idx % len(colors)]
-
-        timeline = player_timelines[uid]
-        if not timeline: continue
-
-        played_days = sorted(timeline.keys())
-        wars = [timeline[d] for d in played_days]
+    for player in series:
+        name = player['name']
+        color = player['color']
+        played_days = player['days']
+        wars = player['wars']
 
         # --- THE FIX: We removed the explicit marker ('o') plotting here ---
         # NO MORE SPOTS AT EVERY DAY. Only smooth line segments will remain.
 
-        # Connect the segments with specialized logical styling
-        for i in range(len(played_days) - 1):
-            d1, d2 = played_days[i], played_days[i+1]
-            w1, w2 = wars[i], wars[i+1]
+        # Each style is ONE NaN-broken polyline per player, so the artist count
+        # grows with players, not players x days.
+        days = np.asarray(played_days, dtype=float)
+        war_arr = np.asarray(wars, dtype=float)
+        gaps = np.flatnonzero(np.diff(days) > 1)  # index i: gap between day i and day i+1
 
-            if d2 - d1 == 1:
-                # Played consecutive days: Smooth Solid line (increased linewidth for beauty)
-                ax.plot([d1, d2], [w1, w2], linestyle='-', color=color, linewidth=3)
-            else:
-                # Skipped days: The AFK Gray Dotted Flatline (tells the story)
-                ax.plot([d1, d2-1], [w1, w1], linestyle=':', color='gray', linewidth=2.5, alpha=0.5)
-                # Dashed line for the jump back in
-                ax.plot([d2-1, d2], [w1, w2], linestyle='--', color=color, linewidth=2.5, alpha=0.9)
+        # Played consecutive days: Smooth Solid runs, broken wherever they skipped
+        ax.plot(np.insert(days, gaps + 1, np.nan), np.insert(war_arr, gaps + 1, np.nan),
+                linestyle='-', color=color, linewidth=3)
+
+        if len(gaps):
+            breaks = np.full(len(gaps), np.nan)
+            rejoin = days[gaps + 1] - 1
+            # Skipped days: The AFK Gray Dotted Flatline (tells the story)
+            ax.plot(np.column_stack([days[gaps], rejoin, breaks]).ravel(),
+                    np.column_stack([war_arr[gaps], war_arr[gaps], breaks]).ravel(),
+                    linestyle=':', color='gray', linewidth=2.5, alpha=0.5)
+            # Dashed line for the jump back in
+            ax.plot(np.column_stack([rejoin, days[gaps + 1], breaks]).ravel(),
+                    np.column_stack([war_arr[gaps], war_arr[gaps + 1], breaks]).ravel(),
+                    linestyle='--', color=color, linewidth=2.5, alpha=0.9)
 
         # If they haven't played up to the CURRENT day, draw a final gray flatline
         last_played = played_days[-1]
@@ -179,8 +322,42 @@ def generate_comparison_graph(guild: discord.Guild, cache: Dict[str, Any], uids:
     # Set tick parameters for beauty
     ax.tick_params(axis='both', which='major', labelsize=10)
     
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    plt.close(fig)
-    return discord.File(buf, filename="head_to_head_comparison.png")
\ No newline at end of file
+    return _to_png(fig)
+def build_h2h_grid(cache: Dict[str, Any], uids: List[str], names: Dict[str, str]) -> Dict[str, Any]:
+    """Plain head-to-head tables (row player vs column player) for the heatmap worker."""
+    wins, ties = cache.matrix.head_to_head_table(uids)
+    return {'names': [names[uid] for uid in uids], 'wins': wins.tolist(), 'ties': ties.tolist()}
+
+def generate_h2h_heatmap(grid: Dict[str, Any]) -> bytes:
+    """
+    All-pairs heatmap: each cell is the row player's win % against the column player
+    (ties excluded), annotated with the W-L record when the grid is small enough to read.
+    Runs inside a render worker: takes plain data, returns PNG bytes.
+    """
+    import numpy as np
+    plt = _pyplot()
+    names = [clean_name(n) or n for n in grid['names']]
+    wins = np.asarray(grid['wins'], dtype=float)
+    decided = wins + wins.T
+    share = np.divide(wins, decided, out=np.full_like(wins, np.nan), where=decided > 0) * 100
+
+    size = max(6, 0.55 * len(names) + 2)
+    fig, ax = plt.subplots(figsize=(size + 1.5, size))
+    image = ax.imshow(share, cmap='RdYlGn', vmin=0, vmax=100)
+    fig.colorbar(image, ax=ax, fraction=0.046, pad=0.04, label="Win % (ties excluded)")
+
+    ax.set_xticks(range(len(names)))
+    ax.set_yticks(range(len(names)))
+    ax.set_xticklabels(names, rotation=45, ha='right')
+    ax.set_yticklabels(names)
+    ax.set_xlabel("Opponent")
+    ax.set_title("Head-to-Head Win Rates", fontsize=16, fontweight='bold')
+    ax.grid(False)
+
+    if len(names) <= 15:
+        for i in range(len(names)):
+            for j in range(len(names)):
+                if i == j or not decided[i, j]: continue
+                ax.text(j, i, f"{int(wins[i, j])}-{int(wins[j, i])}", ha='center', va='center', fontsize=8)
+
+    return _to_png(fig)
@@ -0,0 +1,514 @@
+"""
+Benchmarks for the bot's hot paths on synthetic seasons. Run from the repo root:
+
+    python benchmarks.py                               # every suite at every scale
+    python benchmarks.py parser stats --scales small   # a subset
+    python benchmarks.py --json out.json               # machine-readable results
+    python benchmarks.py --json new.json --compare old.json
+
+Each row is the best of N runs for one (suite, scale, metric). --compare prints the ratio
+against a previous --json file so regressions show up between runs.
+"""
+import os
+import re
+import sys
+import copy
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Callable, Tuple, Optional
+import discord
+from config import CONFIG
+from utils import clean_name, parse_wordle_message
+import data
+import storage
+import analytics
+import rescan
+from scores import ScoreMatrix
+
+FAIL_PENALTY = 7
+
+def parse_wordle_message_reference(content, name_map, fail_penalty):
+    """The original per-call-compiling parser, kept verbatim as the equivalence oracle."""
+    score_pattern = re.compile(r"([X\d])/6:(.*)")
+    mention_pattern = re.compile(r"<@!?(\d+)>")
+    streak_pattern = re.compile(r"on a (\d+) day streak")
+
+    results = []
+    streak = 0
+
+    streak_match = streak_pattern.search(content)
+    if streak_match:
+        streak = int(streak_match.group(1))
+
+    if "Your group is on a" in content:
+        for line in content.split('\n'):
+            line = line.strip()
+            match = score_pattern.search(line)
+            if match:
+                raw_score = match.group(1)
+                user_part = match.group(2)
+                score = fail_penalty if raw_score == 'X' else int(raw_score)
+                found_users = set()
+
+                mentions = mention_pattern.findall(user_part)
+                for uid in mentions:
+                    found_users.add(uid)
+                    user_part = re.sub(f"<@!?{uid}>", "", user_part)
+
+                for chunk in user_part.split('@'):
+                    raw_text = chunk.strip().lower()
+                    if not raw_text: continue
+
+                    if raw_text in name_map:
+                        found_users.add(name_map[raw_text])
+                        continue
+
+                    clean_text = clean_name(raw_text).strip()
+                    if clean_text in name_map:
+                        found_users.add(name_map[clean_text])
+                        continue
+
+                for uid in found_users: results.append((uid, score))
+
+    return results, streak
+
+# --- Corpus ---
+# Recaps in the shape the Official Wordle Bot posts them (mentions, bare @names, emoji names, CRLF, noise).
+REAL_RECAPS = [
+    "**Your group is on a 12 day streak!** 🔥 Here are yesterday's results:\n"
+    "👑 3/6: <@286834144653344768> <@1003788126508040334>\n"
+    "4/6: <@361434482735054850>\n"
+    "X/6: <@464040605631119362>",
+
+    "**Your group is on a 57 day streak!** 🔥 Here are yesterday's results:\n"
+    "👑 2/6: @Max 🎉\n"
+    "4/6: <@!1003788126508040334> @ioannis\n"
+    "5/6: @Some Long Name ✨ @another_user\n"
+    "6/6: <@361434482735054850>",
+
+    "**Your group is on a 3 day streak!** 🔥 Here are yesterday's results:\r\n"
+    "👑 3/6: <@286834144653344768> @Unknown Person\r\n"
+    "X/6: @ioannis <@464040605631119362> trailing words  \r\n",
+
+    "Your group is on a 101 day streak! Here are yesterday's results:\n"
+    "👑 4/6: <@1003788126508040334><@286834144653344768>\n"
+    "5/6: @Max 🎉@ioannis",
+
+    "Just chatting about the puzzle, 3/6: not a recap",
+]
+
+REAL_NAME_MAP = {
+    "max 🎉": "286834144653344768", "max": "286834144653344768",
+    "ioannis": "1003788126508040334",
+    "some long name ✨": "361434482735054850", "some long name": "361434482735054850",
+    "another_user": "464040605631119362",
+}
+
+def make_players(n: int, seed: int = 0, emoji_rate: float = 0.3) -> List[Tuple[str, str]]:
+    """(uid, display name) pairs; a share of the names carry emoji/accents to exercise clean_name."""
+    rng = random.Random(seed)
+    decorations = ["🎉", "✨", "🔥", "👑", "🐍", "é", "ñ"]
+    players = []
+    for i in range(n):
+        name = f"Player {i}"
+        if rng.random() < emoji_rate:
+            name += " " + rng.choice(decorations)
+        players.append((str(10**17 + i), name))
+    return players
+
+def make_name_map(players: List[Tuple[str, str]]) -> Dict[str, str]:
+    name_map = {}
+    for uid, name in players:
+        name_map[name.lower().strip()] = uid
+        clean = clean_name(name).lower().strip()
+        if clean: name_map[clean] = uid
+    return name_map
+
+def make_recap(rng: random.Random, players: List[Tuple[str, str]], streak: int,
+               participation: float = 0.8, fail_rate: float = 0.08, mention_rate: float = 0.7) -> str:
+    """One synthetic recap: players bucketed by score, each either pinged or written as @name."""
+    by_score: Dict[int, List[str]] = {}
+    for uid, name in players:
+        if rng.random() > participation: continue
+        score = FAIL_PENALTY if rng.random() < fail_rate else rng.choice([2, 3, 3, 4, 4, 4, 5, 5, 6])
+        if rng.random() < mention_rate:
+            token = f"<@{uid}>"
+        else:
+            # Bare names sometimes carry an extra emoji, which only the clean_name fallback resolves
+            token = f"@{name}" if rng.random() < 0.5 else f"@{name} 🔥"
+        by_score.setdefault(score, []).append(token)
+
+    lines = [f"**Your group is on a {streak} day streak!** 🔥 Here are yesterday's results:"]
+    for i, score in enumerate(sorted(by_score)):
+        label = "X" if score == FAIL_PENALTY else str(score)
+        lines.append(f"{'👑 ' if i == 0 else ''}{label}/6: {' '.join(by_score[score])}")
+    return "\n".join(lines)
+
+def synthetic_corpus(n_messages: int, n_players: int, seed: int = 0) -> Tuple[List[str], Dict[str, str]]:
+    rng = random.Random(seed)
+    players = make_players(n_players, seed)
+    return [make_recap(rng, players, i + 1) for i in range(n_messages)], make_name_map(players)
+
+# --- Synthetic channels and caches ---
+class SyntheticMessage:
+    """Just enough of discord.Message for data._parse_game."""
+    __slots__ = ("id", "content", "author", "created_at")
+
+    def __init__(self, created_at: datetime, content: str, author_id: int, seq: int = 0):
+        self.id = discord.utils.time_snowflake(created_at) + seq
+        self.content = content
+        self.author = discord.Object(id=author_id)
+        self.created_at = created_at
+
+class SyntheticMember:
+    def __init__(self, uid: str, name: str):
+        self.id = int(uid)
+        self.name = name.lower().replace(" ", "_")
+        self.display_name = name
+        self.global_name = None
+
+class SyntheticGuild:
+    def __init__(self, players: List[Tuple[str, str]], guild_id: int = 1):
+        self.id = guild_id
+        self.name = "benchmark"
+        self.members = [SyntheticMember(uid, name) for uid, name in players]
+        self._by_id = {m.id: m for m in self.members}
+
+    def get_member(self, uid: int) -> Optional[SyntheticMember]:
+        return self._by_id.get(uid)
+
+class SyntheticChannel:
+    """Serves a message list through the channel.history() interface data and rescan page through."""
+    def __init__(self, messages: List[SyntheticMessage], guild: SyntheticGuild, channel_id: int = 1):
+        self.id = channel_id
+        self.guild = guild
+        self.messages = sorted(messages, key=lambda m: m.id)
+
+    @staticmethod
+    def _bound(value) -> Optional[int]:
+        if value is None: return None
+        if isinstance(value, datetime): return discord.utils.time_snowflake(value)
+        return value.id
+
+    async def _iterate(self, after, before, oldest_first, limit):
+        lo, hi = self._bound(after), self._bound(before)
+        selected = [m for m in self.messages if (lo is None or m.id > lo) and (hi is None or m.id < hi)]
+        if not oldest_first: selected.reverse()
+        for msg in selected[:limit] if limit else selected:
+            yield msg
+
+    def history(self, limit: Optional[int] = 100, after=None, before=None, oldest_first: Optional[bool] = None):
+        return self._iterate(after, before, after is not None if oldest_first is None else oldest_first, limit)
+
+class StalledChannel:
+    """Wraps a channel so history() hangs after `limit` messages in total, like a connection that stopped responding."""
+    def __init__(self, channel: SyntheticChannel, limit: int):
+        self.channel = channel
+        self.remaining = limit
+
+    def __getattr__(self, name):
+        return getattr(self.channel, name)
+
+    async def _iterate(self, messages):
+        async for msg in messages:
+            if self.remaining <= 0: await asyncio.sleep(3600)
+            self.remaining -= 1
+            yield msg
+
+    def history(self, **kwargs):
+        return self._iterate(self.channel.history(**kwargs))
+
+class Season:
+    """A synthetic season: recap channel, guild, parsed games and the cache/matrix the bot would hold."""
+    def __init__(self, days: int, players: int, participation: float = 0.8, fail_rate: float = 0.08,
+                 emoji_rate: float = 0.3, mention_rate: float = 0.7, chatter: int = 2, seed: int = 0):
+        rng = random.Random(seed)
+        self.days, self.n_players = days, players
+        self.players = make_players(players, seed, emoji_rate)
+        self.name_map = make_name_map(self.players)
+        self.guild = SyntheticGuild(self.players)
+
+        start = CONFIG["STREAK_START_DATE"] + timedelta(hours=12)
+        bot_id = CONFIG["WORDLE_BOT_ID"]
+        messages = []
+        for day in range(days):
+            posted = start + timedelta(days=day)
+            messages.append(SyntheticMessage(posted, make_recap(rng, self.players, day + 1, participation,
+                                                                fail_rate, mention_rate), bot_id))
+            # Ordinary conversation the scan has to page through and skip
+            for i in range(chatter):
+                messages.append(SyntheticMessage(posted + timedelta(minutes=i + 1), "nice one", bot_id + 1, i + 1))
+        self.channel = SyntheticChannel(messages, self.guild)
+        self.recaps = [m.content for m in messages if m.author.id == bot_id]
+
+        self.games = [g for g in (data._parse_game(m, self.name_map) for m in messages) if g]
+        self.cache = data.get_empty_cache()
+        for game in self.games:
+            data._ingest_game(self.cache, game)
+        self.view = data.CacheView(self.cache, ScoreMatrix.from_games(self.games, CONFIG["FAIL_PENALTY"], CONFIG["MIN_GAMES"]), "0-1")
+
+# name → (days, players); "large" is several years of a busy server
+SCALES = {
+    "small": (90, 8),
+    "medium": (365, 25),
+    "large": (1500, 80),
+}
+
+# --- Timing ---
+def best_of(fn: Callable[[], Any], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_parser(season: Season, repeat: int) -> Dict[str, float]:
+    corpora = [("real", REAL_RECAPS, REAL_NAME_MAP), ("synthetic", season.recaps, season.name_map)]
+
+    # Output must match the original parser exactly before timing means anything
+    for label, corpus, names in corpora:
+        for content in corpus:
+            expected = parse_wordle_message_reference(content, names, FAIL_PENALTY)
+            actual = parse_wordle_message(content, names, FAIL_PENALTY)
+            if actual != expected:
+                raise AssertionError(f"Parser mismatch on {label} message:\n{content}\n{expected}\n!=\n{actual}")
+
+    def run(parser):
+        return lambda: [parser(c, season.name_map, FAIL_PENALTY) for c in season.recaps]
+
+    return {
+        "parse_wordle_message": best_of(run(parse_wordle_message), repeat),
+        "parse_wordle_message_reference": best_of(run(parse_wordle_message_reference), repeat),
+    }
+
+def bench_scan(season: Season, repeat: int) -> Dict[str, float]:
+    """Incremental catch-up over the whole channel: paging, author filter and parsing together."""
+    def run():
+        games = asyncio.run(data._scan_discord_history(season.channel, None, CONFIG["STREAK_START_DATE"], season.name_map))
+        assert len(games) == len(season.games)
+    return {"scan_discord_history": best_of(run, repeat)}
+
+def _matrix_state(matrix: ScoreMatrix) -> Dict[str, Any]:
+    uids = sorted(matrix.player_stats())
+    wins, ties = matrix.head_to_head_table(uids)
+    return {"players": matrix.player_stats(), "standings": matrix.standings(), "ranked": matrix.ranked(),
+            "head_to_head": (wins.tolist(), ties.tolist()),
+            "games": [matrix.game_summary(row) for row in range(matrix.n_games)]}
+
+def check_rebuild_equivalence(cache: Dict[str, Any], matrix: ScoreMatrix, label: str):
+    """A corrected cache and matrix must match rebuilding both from the corrected games."""
+    expected = data._rebuild_stats({"games": list(cache["games"])})["players"]
+    if cache["players"] != expected:
+        raise AssertionError(f"Player stats after {label} differ from a full rebuild")
+    if _matrix_state(matrix) != _matrix_state(ScoreMatrix.from_games(cache["games"], CONFIG["FAIL_PENALTY"])):
+        raise AssertionError(f"Score matrix after {label} differs from ScoreMatrix.from_games")
+
+def bench_rescan(season: Season, repeat: int) -> Dict[str, float]:
+    """Partitioned /rescan scan with checkpoints, after checking that an interrupted scan resumes losslessly."""
+    parse = lambda msg: data._parse_game(msg, season.name_map)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, data.RESCAN_CHECKPOINT_FILE)
+
+        # Cancel the scan halfway: the checkpoint must hold the work done so far, and the resumed
+        # run must fetch only the rest and still find every game exactly once. The partitions start far
+        # enough back that every message falls in the last one and run one at a time, so the empty ones
+        # finish (and save) first and only the cancellation path can record how far the stalled one got.
+        total = len(season.channel.messages)
+        first = season.channel.messages[0].created_at
+        start = discord.utils.utcnow() - (discord.utils.utcnow() - first) * (CONFIG["RESCAN_PARTITIONS"] + 1)
+        stalled = StalledChannel(season.channel, total // 2)
+        concurrency, CONFIG["RESCAN_CONCURRENCY"] = CONFIG["RESCAN_CONCURRENCY"], 1
+        try:
+            asyncio.run(asyncio.wait_for(rescan.scan_full_history(stalled, start, parse, path), 1))
+            raise AssertionError("Stalled rescan was not cancelled")
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            CONFIG["RESCAN_CONCURRENCY"] = concurrency
+        progress = rescan.ScanProgress()
+        games = asyncio.run(rescan.scan_full_history(season.channel, start, parse, path, progress))
+        if progress._resumed_messages != total // 2 or progress.messages != total:
+            raise AssertionError(f"Rescan resumed at {progress._resumed_messages} of {total} messages "
+                                 f"(expected {total // 2}) and scanned {progress.messages}")
+        if games != season.games:
+            raise AssertionError("Resumed rescan found different games than the season holds")
+
+        def run():
+            rescan.clear_checkpoint(path)
+            assert len(asyncio.run(rescan.scan_full_history(season.channel, CONFIG["STREAK_START_DATE"], parse, path))) == len(season.games)
+        return {"scan_full_history": best_of(run, repeat)}
+
+def bench_stats(season: Season, repeat: int) -> Dict[str, float]:
+    def rebuild():
+        data._rebuild_stats({"games": list(season.games)})
+
+    # An edited recap from a week ago: re-scored, then put back, replaying only the games after it
+    cache = copy.deepcopy(season.cache)
+    matrix = ScoreMatrix.from_games(cache["games"], CONFIG["FAIL_PENALTY"])
+    original = cache["games"][-7]
+    edited = dict(original, scores={uid: FAIL_PENALTY for uid in original['scores']})
+    def correct():
+        data._correct_game(cache, matrix, original['id'], edited)
+        data._correct_game(cache, matrix, original['id'], original)
+
+    # The replayed suffix must leave exactly what a full rebuild gives before timing means anything
+    data._correct_game(cache, matrix, original['id'], edited)
+    check_rebuild_equivalence(cache, matrix, "edit")
+    deleted = [g['id'] for g in cache["games"][-30::3]]
+    data._correct_games(cache, matrix, dict.fromkeys(deleted))
+    check_rebuild_equivalence(cache, matrix, "bulk delete")
+    cache = copy.deepcopy(season.cache)
+    matrix = ScoreMatrix.from_games(cache["games"], CONFIG["FAIL_PENALTY"])
+    # A penalty inside 1..6 makes some solved-looking scores fails: both builds must bucket them alike
+    for penalty in (FAIL_PENALTY, 6):
+        appended = ScoreMatrix(penalty)
+        for game in season.games:
+            appended.append_game(game)
+        if _matrix_state(appended) != _matrix_state(ScoreMatrix.from_games(season.games, penalty)):
+            raise AssertionError(f"Appended and bulk-built score matrices differ (fail penalty {penalty})")
+
+    return {
+        "rebuild_stats": best_of(rebuild, repeat),
+        "score_matrix_from_games": best_of(lambda: ScoreMatrix.from_games(season.games, CONFIG["FAIL_PENALTY"]), repeat),
+        "correct_game_last_week": best_of(correct, repeat),
+    }
+
+def bench_store(season: Season, repeat: int) -> Dict[str, float]:
+    """Snapshot save/load and the per-game journal append, against a throwaway shard directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        shard = data.Shard(0, 0)
+        shard.directory = tmp
+        shard.cache_file = os.path.join(tmp, data.CACHE_FILE)
+        shard.journal_file = os.path.join(tmp, data.JOURNAL_FILE)
+
+        def save():
+            storage.write_snapshot(shard.cache_file, storage.encode_snapshot(season.cache))
+
+        def load():
+            shard.cache = None
+            assert len(data._get_store(shard)["games"]) == len(season.games)
+
+        record = [{"op": "add", "game": season.games[-1]}]
+        results = {
+            "save_snapshot": best_of(save, repeat),
+            "load_cache": best_of(load, repeat),
+            "append_journal": best_of(lambda: storage.append_journal(shard.journal_file, record), repeat),
+        }
+    return results
+
+def bench_leaderboard(season: Season, repeat: int) -> Dict[str, float]:
+    def run():
+        stats = analytics.get_leaderboard_stats(season.guild, season.view)
+        analytics.render_leaderboard_table(stats, season.view)
+
+    def first_page():
+        # Cold: what the first /wordlestats after a new game pays
+        analytics.invalidate_pages(season.view.scope, -1)
+        analytics.render_season_page(season.guild, season.view, 0)
+
+    return {
+        "leaderboard": best_of(run, repeat),
+        "season_page_cold": best_of(first_page, repeat),
+        "season_page_cached": best_of(lambda: analytics.render_season_page(season.guild, season.view, 0), repeat),
+    }
+
+def bench_graphs(season: Season, repeat: int) -> Dict[str, float]:
+    """Renders in-process (the bot runs these in render workers; the cost per graph is the same)."""
+    matrix = season.view.matrix
+    top = matrix.uids[int(matrix.games_played().argmax())]
+    names = {uid: name for uid, name in season.players}
+    everyone = sorted(matrix.uids, key=int)
+
+    war_history = matrix.war_history(top)
+    series, max_day = analytics.build_comparison_series(season.view, everyone, names)
+    five, _ = analytics.build_comparison_series(season.view, everyone[:5], names)
+    repeat = min(repeat, 3)
+    return {
+        "generate_war_graph": best_of(lambda: analytics.generate_war_graph(names[top], war_history), repeat),
+        "generate_comparison_graph_5": best_of(lambda: analytics.generate_comparison_graph(five, max_day), repeat),
+        "generate_comparison_graph_all": best_of(lambda: analytics.generate_comparison_graph(series, max_day), repeat),
+        "build_comparison_series_all": best_of(lambda: analytics.build_comparison_series(season.view, everyone, names), repeat),
+    }
+
+SUITES: Dict[str, Callable[[Season, int], Dict[str, float]]] = {
+    "parser": bench_parser,
+    "scan": bench_scan,
+    "rescan": bench_rescan,
+    "stats": bench_stats,
+    "store": bench_store,
+    "leaderboard": bench_leaderboard,
+    "graphs": bench_graphs,
+}
+
+def run_benchmarks(suites: List[str], scales: List[str], repeat: int = 5, seed: int = 0) -> Dict[str, Any]:
+    results = []
+    for scale in scales:
+        days, players = SCALES[scale]
+        season = Season(days, players, seed=seed)
+        for suite in suites:
+            for metric, seconds in SUITES[suite](season, repeat).items():
+                results.append({"suite": suite, "scale": scale, "days": days, "players": players,
+                                "games": len(season.games), "metric": metric, "seconds": seconds})
+                print(f"{scale:<7} {suite:<12} {metric:<32} {seconds * 1000:10.2f} ms", file=sys.stderr)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """One line per metric present in both runs: baseline → current and the ratio (>1 is slower)."""
+    def key(r): return (r["suite"], r["scale"], r["metric"])
+    old = {key(r): r["seconds"] for r in baseline.get("results", [])}
+    lines = []
+    for r in current["results"]:
+        before = old.get(key(r))
+        if not before: continue
+        ratio = r["seconds"] / before
+        flag = "  ⚠️ slower" if ratio > 1.1 else ""
+        lines.append(f"{r['scale']:<7} {r['metric']:<32} {before * 1000:9.2f} → {r['seconds'] * 1000:9.2f} ms "
+                     f"({ratio:.2f}x){flag}")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Wordle bot hot paths.")
+    parser.add_argument("suites", nargs="*", help=f"any of {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--scales", default=",".join(SCALES), help=f"comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per metric; the best is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH", help="previous --json output to compare against")
+    args = parser.parse_args(argv)
+    # Synthetic names carry emoji the default matplotlib font lacks; that's expected, not news
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+
+    suites = args.suites or list(SUITES)
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in suites if s not in SUITES] + [s for s in scales if s not in SCALES]
+    if unknown: parser.error(f"unknown suite/scale: {', '.join(unknown)}")
+
+    report = run_benchmarks(suites, scales, args.repeat, args.seed)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f: json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f: baseline = json.load(f)
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,20 @@
+import time
+_STARTED = time.perf_counter()
+from config import CONFIG, get_token
+_CONFIG_LOADED = time.perf_counter()
+
+import asyncio
+import importlib
 import discord
 import logging
 import traceback
 from discord import app_commands
 from discord.ext import commands
-from config import get_token
+import data
+import render
+import metrics
+import export
+_IMPORTED = time.perf_counter()
 
 # --- LOGGING CONFIGURATION ---
 logging.basicConfig(
@@ -19,15 +30,77 @@ class WordleBot(commands.Bot):
         intents.message_content = True
         intents.members = True
         super().__init__(command_prefix='!', intents=intents)
+        # Seconds per startup phase, reported once on the first on_ready
+        self.startup = {"config": _CONFIG_LOADED - _STARTED, "imports": _IMPORTED - _CONFIG_LOADED}
+        self._setup_done = None
+        self._prewarm_task = None
 
     async def setup_hook(self):
         logger.info("⚙️ Loading Cogs...")
+        started = time.perf_counter()
         await self.load_extension("cogs")
+        await metrics.start_exporters()
+        await export.start(self)
+        self._setup_done = time.perf_counter()
+        self.startup["cog_setup"] = self._setup_done - started
         logger.info("✅ Bot setup complete!")
 
     async def on_ready(self):
         logger.info(f'🚀 Logged in as {self.user} (ID: {self.user.id})')
         logger.info('Ready!')
+        # on_ready fires again after every reconnect; only the first one is startup
+        if "login" not in self.startup:
+            self.startup["login"] = time.perf_counter() - self._setup_done
+            self.startup["total"] = time.perf_counter() - _STARTED
+            for phase, seconds in self.startup.items():
+                metrics.observe("startup_seconds", seconds, phase=phase)
+            logger.info("⏱️ Startup: " + " · ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.startup.items()))
+            if CONFIG["PREWARM"]:
+                self._prewarm_task = asyncio.create_task(self.prewarm())
+
+    async def prewarm(self):
+        """
+        Pays the lazy costs in the background once we're online: numpy + the score matrix code,
+        the cache shards stored for our guilds, and the render workers' matplotlib import.
+        Everything here would otherwise happen on the first command that needs it.
+        """
+        timings = {}
+        started = time.perf_counter()
+        await asyncio.to_thread(importlib.import_module, "scores")
+        timings["numpy"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        loaded = 0
+        for guild in self.guilds:
+            for channel_id in data.stored_channel_ids(guild.id):
+                channel = guild.get_channel(channel_id)
+                if channel is None: continue
+                try:
+                    loaded += await data.preload(channel)
+                except Exception as e:
+                    logger.error(f"❌ Prewarm failed to load cache for #{channel}: {e}")
+        timings["cache_load"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            await render.get_service().warm_up()
+        except Exception as e:
+            logger.error(f"❌ Prewarm failed to start render workers: {e}")
+        timings["render_workers"] = time.perf_counter() - started
+
+        for phase, seconds in timings.items():
+            metrics.observe("startup_seconds", seconds, phase=f"prewarm_{phase}")
+        logger.info(f"🔥 Prewarm done ({loaded} shard(s) loaded): " +
+                    " · ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in timings.items()))
+
+    async def close(self):
+        # Make sure queued cache writes reach the disk before we go down
+        if self._prewarm_task is not None: self._prewarm_task.cancel()
+        await data.flush()
+        render.shutdown()
+        await metrics.stop_exporters()
+        await export.stop()
+        await super().close()
 
 bot = WordleBot()
 
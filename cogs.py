@@ -1,19 +1,140 @@
 import discord
+import io
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Callable
+import asyncio
 import logging
 from discord import app_commands
 from discord.ext import commands
 from config import CONFIG
 import data
+import names
 import analytics
+import render
+import metrics
+from rescan import ScanProgress
+from utils import clean_name
 
 logger = logging.getLogger("cogs")
 
+RESCAN_STATUS_INTERVAL = 5  # seconds between /rescan progress edits
+H2H_MAP_MAX_PLAYERS = 20  # beyond this the heatmap labels stop being readable
+LEADERBOARD_VIEW_TIMEOUT = 600  # seconds before the page buttons stop responding
+
+def parse_window(since: Optional[str], until: Optional[str], last_n_days: Optional[int]) -> Tuple[Optional[float], Optional[float], str]:
+    """
+    /wordlestats date options → (since timestamp, until timestamp, label). Dates are YYYY-MM-DD in the
+    configured timezone and `until` is inclusive. Raises ValueError with a message for the user.
+    """
+    if last_n_days is not None and (since or until):
+        raise ValueError("Use either `last_n_days` or `since`/`until`, not both.")
+    if last_n_days is not None:
+        start = datetime.now(CONFIG["TZ"]) - timedelta(days=last_n_days)
+        return start.timestamp(), None, f"Last {last_n_days} Days"
+
+    def day(text: str) -> datetime:
+        try:
+            return datetime.strptime(text.strip(), "%Y-%m-%d").replace(tzinfo=CONFIG["TZ"])
+        except ValueError:
+            raise ValueError(f"`{text}` isn't a date. Use YYYY-MM-DD, e.g. 2025-03-01.")
+
+    start = day(since) if since else None
+    end = day(until) + timedelta(days=1) if until else None
+    if start and end and end <= start:
+        raise ValueError("`until` must not be before `since`.")
+    if start and end: label = f"{since} → {until}"
+    elif start: label = f"Since {since}"
+    else: label = f"Until {until}"
+    return start.timestamp() if start else None, end.timestamp() if end else None, label
+
+class LeaderboardView(discord.ui.View):
+    """
+    ◀ / ▶ page buttons for a leaderboard. `render(page)` returns (text, page count); it serves cached
+    pages or slices already computed stats, so flipping a page never recomputes anything.
+    """
+    def __init__(self, render: Callable[[int], Tuple[str, int]], pages: int):
+        super().__init__(timeout=LEADERBOARD_VIEW_TIMEOUT)
+        self.render = render
+        self.page = 0
+        self.pages = pages
+        self.message: Optional[discord.Message] = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous.disabled = self.page <= 0
+        self.next.disabled = self.page >= self.pages - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        text, self.pages = self.render(page)
+        # New games can shrink the page count under us; the render already clamped the page it drew
+        self.page = min(max(page, 0), self.pages - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(content=text, view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+def season_page_renderer(channel, guild: discord.Guild, footer: str = "") -> Callable[[int], Tuple[str, int]]:
+    """Pages of the channel's current season leaderboard, always from its latest cache version."""
+    def render_page(page: int) -> Tuple[str, int]:
+        text, pages = analytics.render_season_page(guild, data.get_cache(channel), page)
+        return text + footer, pages
+    return render_page
+
 class WordleCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        data.add_change_listener(render.invalidate_cache)
+        data.add_change_listener(analytics.invalidate_pages)
+
+    async def cog_unload(self):
+        render.shutdown()
+
+    # --- Latency metrics for every slash command in this cog ---
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+    def _observe_command(self, interaction: discord.Interaction, status: str):
+        started = interaction.extras.get("started")
+        if started is not None and interaction.command is not None:
+            metrics.observe("command_seconds", time.perf_counter() - started,
+                            command=interaction.command.name, status=status)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self._observe_command(interaction, "ok")
+
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        # Still handled (and reported to the user) by the tree's global error handler
+        self._observe_command(interaction, "error")
 
     async def player_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-        cache = await data.load_cache()
+        with metrics.timer("command_seconds", command="autocomplete", status="ok"):
+            return self._player_choices(interaction, current)
+
+    async def season_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        # Newest first; names come from the season index, so no archive is loaded
+        seasons = reversed(data.list_seasons(interaction.channel))
+        return [app_commands.Choice(name=s["name"], value=s["name"])
+                for s in seasons if current.lower() in s["name"].lower()][:25]
+
+    def _player_choices(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
         choices = []
         
         # 1. Read what the user has ALREADY selected in the other boxes
@@ -29,18 +150,28 @@ class WordleCommands(commands.Cog):
         if "all" in current.lower() and "ALL" not in selected_uids:
             choices.append(app_commands.Choice(name="🌟 ALL PLAYERS 🌟", value="ALL"))
             
-        # 3. Build the rest of the list, skipping anyone already selected
-        for uid in cache.get("players", {}).keys():
-            if uid in selected_uids:
-                continue # Skip Max if Max is already in box 1!
-                
-            member = interaction.guild.get_member(int(uid))
-            display = member.display_name if member else f"Unknown ({uid})"
-            
-            if current.lower() in display.lower():
-                choices.append(app_commands.Choice(name=display, value=uid))
+        # 3. Look the rest up in the name index, skipping anyone already selected
+        #    (players of the archived season picked in the same command, if any)
+        season = data.find_season(interaction.channel, getattr(interaction.namespace, 'season', None) or "")
+        if season is not None:
+            players = {s["uid"] for s in season["standings"]}
+        else:
+            players = data.get_cache(interaction.channel).get("players", {})
+        index = names.get_name_index(interaction.guild)
+        limit = 25 - len(choices)
+        for uid in index.search(current, limit, accept=lambda u: u not in selected_uids, candidates=players):
+            choices.append(app_commands.Choice(name=index.display_name(uid), value=uid))
+
+        # 4. Players who have left the server aren't indexed, so fall back to their raw ID
+        if len(choices) < 25:
+            for uid in players:
+                if uid in index or uid in selected_uids: continue
+                display = f"Unknown ({uid})"
+                if current.lower() in display.lower():
+                    choices.append(app_commands.Choice(name=display, value=uid))
+                    if len(choices) >= 25: break
                 
-        return choices[:25]
+        return choices
     
     @app_commands.command(name="compare", description="Compare player WAR graphs (Choose up to 5, or ALL)")
     @app_commands.autocomplete(player1=player_autocomplete, player2=player_autocomplete, player3=player_autocomplete, player4=player_autocomplete, player5=player_autocomplete)
@@ -55,7 +186,7 @@ class WordleCommands(commands.Cog):
         await interaction.response.defer(thinking=True)
         
         logger.info(f"Public command /compare used by {interaction.user.name}")
-        cache = await data.update_data(interaction.channel, interaction.guild)
+        cache = await data.update_data(interaction.channel, interaction.guild, allow_stale=True)
         
         # Gather whatever they typed into the boxes
         inputs = [player1, player2, player3, player4, player5]
@@ -79,28 +210,49 @@ class WordleCommands(commands.Cog):
             await interaction.followup.send("❌ Please select at least 2 different players, or choose '🌟 ALL PLAYERS 🌟'.", ephemeral=True)
             return
 
-        # Generate the graph
-        file = analytics.generate_comparison_graph(interaction.guild, cache, uids_to_compare)
+        # Canonical order, so the same set of players always gets the same colors (and cache entry)
+        uids_to_compare.sort(key=int)
+        names = {}
+        for uid in uids_to_compare:
+            user = interaction.guild.get_member(int(uid))
+            names[uid] = user.display_name if user else f"Player {uid}"
+
+        # Generate the graph (served from the render cache if nothing changed since last time)
+        try:
+            png = await render.render_comparison_graph(
+                uids_to_compare, names, cache.tag,
+                lambda: analytics.build_comparison_series(cache, uids_to_compare, names))
+        except render.RenderQueueFull as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        file = discord.File(io.BytesIO(png), filename="head_to_head_comparison.png")
         
         # THE FIX: Removed ephemeral=True and the "Confidential" text
         await interaction.followup.send(f"📊 **Head-to-Head Comparison ({len(uids_to_compare)} Players)**", file=file)
 
     @app_commands.command(name="genplots", description="Generate WAR graph")
-    @app_commands.autocomplete(player_id=player_autocomplete)
-    async def genplots(self, interaction: discord.Interaction, player_id: str):
+    @app_commands.describe(season="A past season (defaults to the current one)")
+    @app_commands.autocomplete(player_id=player_autocomplete, season=season_autocomplete)
+    async def genplots(self, interaction: discord.Interaction, player_id: str, season: str = None):
         # THE FIX: Added ephemeral=True so it hides the "thinking..." message
         await interaction.response.defer(thinking=True, ephemeral=True)
         
         logger.info(f"Command /genplots used by {interaction.user.name} (Hidden/Ephemeral)")
         
-        cache = await data.update_data(interaction.channel, interaction.guild)
+        if season:
+            cache = await data.load_season(interaction.channel, season)
+            if cache is None:
+                await interaction.followup.send(f"❌ No archived season called `{season}`.", ephemeral=True)
+                return
+        else:
+            cache = await data.update_data(interaction.channel, interaction.guild, allow_stale=True)
         
         if player_id not in cache["players"]:
             # THE FIX: Added ephemeral=True to error messages
             await interaction.followup.send("❌ No data for this player.", ephemeral=True)
             return
 
-        war_hist = cache["players"][player_id]["war_history"]
+        war_hist = cache.matrix.war_history(player_id)
         if len(war_hist) < 2:
             await interaction.followup.send("📉 Not enough games for a graph.", ephemeral=True)
             return
@@ -108,32 +260,204 @@ class WordleCommands(commands.Cog):
         user = interaction.guild.get_member(int(player_id))
         name = user.display_name if user else "Unknown"
         
-        file = analytics.generate_war_graph(name, war_hist)
+        try:
+            png = await render.render_war_graph(player_id, name, war_hist, cache.tag)
+        except render.RenderQueueFull as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        file = discord.File(io.BytesIO(png), filename=f"{clean_name(name)}_war.png")
         
         # THE FIX: Added ephemeral=True to the final graph delivery
         await interaction.followup.send(f"📈 **WAR Analysis for {name}**", file=file, ephemeral=True)
 
+    @app_commands.command(name="h2h", description="Head-to-head record between two players")
+    @app_commands.autocomplete(player1=player_autocomplete, player2=player_autocomplete)
+    async def h2h(self, interaction: discord.Interaction, player1: str, player2: str):
+        await interaction.response.defer(thinking=True)
+        logger.info(f"Command /h2h used by {interaction.user.name}")
+
+        if "ALL" in (player1, player2):
+            await interaction.followup.send("❌ Pick two players. For everyone at once, use `/h2hmap`.", ephemeral=True)
+            return
+        if player1 == player2:
+            await interaction.followup.send("❌ Please select two different players.", ephemeral=True)
+            return
+
+        cache = await data.update_data(interaction.channel, interaction.guild, allow_stale=True)
+        missing = [p for p in (player1, player2) if p not in cache["players"]]
+        if missing:
+            await interaction.followup.send("❌ No data for this player.", ephemeral=True)
+            return
+
+        names = []
+        for uid in (player1, player2):
+            user = interaction.guild.get_member(int(uid))
+            names.append(user.display_name if user else f"Player {uid}")
+
+        wins, losses, ties = cache.matrix.head_to_head(player1, player2)
+        shared = wins + losses + ties
+        if not shared:
+            await interaction.followup.send(f"🤷 **{names[0]}** and **{names[1]}** have never played on the same day.")
+            return
+
+        if wins == losses: verdict = "⚖️ Dead even!"
+        else: verdict = f"👑 **{names[0] if wins > losses else names[1]}** leads the rivalry."
+        await interaction.followup.send(
+            f"⚔️ **Head-to-Head: {names[0]} vs {names[1]}**\n"
+            f"{names[0]} won **{wins}** · {names[1]} won **{losses}** · **{ties}** ties "
+            f"({shared} shared games)\n{verdict}")
+
+    @app_commands.command(name="h2hmap", description="Head-to-head win-rate heatmap for all qualified players")
+    async def h2hmap(self, interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True)
+        logger.info(f"Command /h2hmap used by {interaction.user.name}")
+
+        cache = await data.update_data(interaction.channel, interaction.guild, allow_stale=True)
+        # Leaderboard order, so the strongest players sit top-left
+        stats = sorted(((uid, p) for uid, p in cache["players"].items() if p["games_played"] >= CONFIG["MIN_GAMES"]),
+                       key=lambda item: item[1]["total_war"], reverse=True)
+        uids = [uid for uid, _ in stats[:H2H_MAP_MAX_PLAYERS]]
+        if len(uids) < 2:
+            await interaction.followup.send(f"⚠️ Need at least 2 players with {CONFIG['MIN_GAMES']}+ games.", ephemeral=True)
+            return
+
+        names = {}
+        for uid in uids:
+            user = interaction.guild.get_member(int(uid))
+            names[uid] = user.display_name if user else f"Player {uid}"
+
+        try:
+            png = await render.render_h2h_heatmap(uids, names, cache.tag,
+                                                  lambda: analytics.build_h2h_grid(cache, uids, names))
+        except render.RenderQueueFull as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        note = f" (top {H2H_MAP_MAX_PLAYERS} by WAR)" if len(stats) > len(uids) else ""
+        await interaction.followup.send(f"⚔️ **Head-to-Head Heatmap{note}**",
+                                        file=discord.File(io.BytesIO(png), filename="h2h_heatmap.png"))
+
+    async def _difficulty(self, interaction: discord.Interaction, count: int, hardest: bool):
+        await interaction.response.defer(thinking=True)
+        logger.info(f"Command /{interaction.command.name} used by {interaction.user.name}")
+
+        cache = await data.update_data(interaction.channel, interaction.guild, allow_stale=True)
+        rows = cache.matrix.extreme_games(count, hardest)
+        await interaction.followup.send(analytics.render_difficulty_table(cache, rows, hardest))
+
+    @app_commands.command(name="hardest", description="The season's hardest days by server average")
+    @app_commands.describe(count="How many days to show")
+    async def hardest(self, interaction: discord.Interaction, count: app_commands.Range[int, 1, 15] = 5):
+        await self._difficulty(interaction, count, hardest=True)
+
+    @app_commands.command(name="easiest", description="The season's easiest days by server average")
+    @app_commands.describe(count="How many days to show")
+    async def easiest(self, interaction: discord.Interaction, count: app_commands.Range[int, 1, 15] = 5):
+        await self._difficulty(interaction, count, hardest=False)
+
     @app_commands.command(name="wordlestats", description="Show Leaderboard")
-    async def wordlestats(self, interaction: discord.Interaction):
+    @app_commands.describe(since="First day to include (YYYY-MM-DD)", until="Last day to include (YYYY-MM-DD)",
+                           last_n_days="Only the last N days (e.g. 7 or 30)",
+                           season="A past season (defaults to the current one)")
+    @app_commands.autocomplete(season=season_autocomplete)
+    async def wordlestats(self, interaction: discord.Interaction, since: str = None, until: str = None,
+                          last_n_days: app_commands.Range[int, 1, 3650] = None, season: str = None):
         await interaction.response.defer(thinking=True)
         logger.info(f"Command /wordlestats used by {interaction.user.name}")
         
-        cache = await data.update_data(interaction.channel, interaction.guild)
-        stats = analytics.get_leaderboard_stats(interaction.guild, cache)
-        
-        # FIX: Now we pass the full cache so it can read the streak number
-        msg = analytics.render_leaderboard_table(stats, cache) 
+        try:
+            windowed = since or until or last_n_days is not None
+            start, end, period = parse_window(since, until, last_n_days) if windowed else (None, None, None)
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
+
+        archived = data.find_season(interaction.channel, season) if season else None
+        if season and archived is None:
+            await interaction.followup.send(f"❌ No archived season called `{season}`.", ephemeral=True)
+            return
+
+        if archived and not windowed:
+            # Final standings were computed when the season was archived: its games aren't loaded
+            stats = analytics.get_standings_stats(interaction.guild, archived["standings"])
+            render_page = lambda page: (
+                analytics.render_leaderboard_table(stats, {}, "Final Standings", archived["games"], archived["name"], page),
+                analytics.leaderboard_pages(len(stats)))
+        elif windowed:
+            cache = await (data.load_season(interaction.channel, season) if archived
+                           else data.update_data(interaction.channel, interaction.guild))
+            if cache is None:
+                await interaction.followup.send(f"❌ No archived season called `{season}`.", ephemeral=True)
+                return
+            # Date → game rows by binary search; totals come off the prefix sums
+            window = cache.matrix.rows_between(start, end)
+            stats = analytics.get_leaderboard_stats(interaction.guild, cache, window)
+            render_page = lambda page: (
+                analytics.render_leaderboard_table(stats, cache, period, window[1] - window[0], cache["season"], page),
+                analytics.leaderboard_pages(len(stats)))
+        else:
+            await data.update_data(interaction.channel, interaction.guild)
+            # Pages come straight off the maintained ranking (cached per cache version)
+            render_page = season_page_renderer(interaction.channel, interaction.guild)
         
-        await interaction.followup.send(msg)
+        msg, pages = render_page(0)
+        if pages > 1:
+            view = LeaderboardView(render_page, pages)
+            view.message = await interaction.followup.send(msg, view=view, wait=True)
+        else:
+            await interaction.followup.send(msg)
 
     @app_commands.command(name="rescan", description="Force Rescan")
     async def rescan(self, interaction: discord.Interaction):
         await interaction.response.defer()
         logger.warning(f"MANUAL RESCAN triggered by {interaction.user.name}")
         
-        await interaction.followup.send("♻️ Rescanning history and wiping old data...")
-        await data.update_data(interaction.channel, interaction.guild, full_rescan=True)
-        await interaction.channel.send("✅ Done.")
+        if data.is_rebuilding(interaction.channel):
+            await interaction.followup.send("⏳ A rescan of this channel is already running.")
+            return
+
+        await interaction.followup.send("♻️ Rescanning history in the background. Stats stay available until the new data is swapped in.")
+        
+        # Plain channel message for progress: interaction followups stop being editable after 15 minutes
+        status = await interaction.channel.send("♻️ Starting scan...")
+        progress = ScanProgress()
+        task = asyncio.create_task(data.rebuild(interaction.channel, interaction.guild, progress))
+        while not task.done():
+            await asyncio.wait({task}, timeout=RESCAN_STATUS_INTERVAL)
+            if not task.done():
+                await status.edit(content=f"♻️ {progress.describe()}")
+        
+        try:
+            cache = task.result()
+        except Exception as e:
+            logger.error(f"❌ Rescan failed for channel {interaction.channel.id}: {e}")
+            await status.edit(content=f"❌ Rescan failed: {e}. Run /rescan again to resume from the last checkpoint.")
+            return
+        await status.edit(content=f"✅ Done. {progress.describe()}\n"
+                                  f"Swapped in {len(cache['games'])} games for {len(cache['players'])} players.")
+
+    @app_commands.command(name="botmetrics", description="Show bot performance metrics (owner only)")
+    async def botmetrics(self, interaction: discord.Interaction):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+            return
+
+        lines = metrics.render_summary().split("\n")
+        for source in ("catch_up", "rescan"):
+            scan = metrics.get_histogram("history_scan_seconds", source=source)
+            if scan and scan.sum:
+                lines.append(f"scan throughput [{source}]: "
+                             f"{metrics.get_counter('history_messages_total', source=source) / scan.sum:,.0f} msg/s")
+        lines.append(f"render queue: {render.get_service().pending}/{render.get_service().capacity} · "
+                     f"shards loaded: {sum(s.cache is not None for s in data.shards())}")
+
+        # Stay under Discord's 2000 character message limit
+        body = ""
+        for line in lines:
+            if len(body) + len(line) > 1900:
+                body += "…\n"
+                break
+            body += line + "\n"
+        await interaction.response.send_message(f"**📈 Bot Metrics**\n```text\n{body}```", ephemeral=True)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -143,14 +467,74 @@ class WordleCommands(commands.Cog):
             if "Your group is on a" in message.content and "day streak" in message.content:
                 logger.info(f"🔥 Official Streak Detected in {message.channel.name}! Replying with stats...")
                 
-                cache = await data.update_data(message.channel, message.guild)
-                stats = analytics.get_leaderboard_stats(message.guild, cache)
+                # Parse the recap we already have in hand; only scan history if we might have a gap
+                cache = await data.ingest_message(message)
+                if cache is None:
+                    cache = await data.update_data(message.channel, message.guild)
                 
-                msg = analytics.render_leaderboard_table(stats, cache)
+                # Only this recap's own game: it may not have parsed, or may sit behind later ones
+                row = cache.game_row(message.id)
+                footer = "\n" + analytics.render_game_line(cache, row) if row is not None else ""
+                render_page = season_page_renderer(message.channel, message.guild, footer)
+                msg, pages = render_page(0)
+                view = LeaderboardView(render_page, pages) if pages > 1 else None
                 
                 # THE FIX: Changed message.channel.send to message.reply
                 # mention_author=False means it links the messages but doesn't send a ping notification
-                await message.reply(msg, mention_author=False)
+                reply = await message.reply(msg, mention_author=False, view=view)
+                if view is not None: view.message = reply
+
+    # --- Edited / deleted recaps (raw events: the message is usually not in the client cache) ---
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.guild_id is None or payload.message.author.id != CONFIG["WORDLE_BOT_ID"]: return
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is not None:
+            await data.correct_message(channel, payload.message_id, payload.message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id is None: return
+        if payload.cached_message is not None and payload.cached_message.author.id != CONFIG["WORDLE_BOT_ID"]: return
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is not None:
+            await data.correct_message(channel, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        channel = self.bot.get_channel(payload.channel_id)
+        if payload.guild_id is None or channel is None: return
+        await data.delete_messages(channel, list(payload.message_ids))
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        data.mark_stale()
+
+    # --- Keep the name index (autocomplete + recap parsing) in sync with the member list ---
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Built once per connect; member events patch it from here on
+        for guild in self.bot.guilds:
+            names.build_index(guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        names.member_changed(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        names.member_changed(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        # Username / global name changes arrive once per user, not per guild
+        for guild in self.bot.guilds:
+            member = guild.get_member(after.id)
+            if member: names.member_changed(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        names.member_removed(member)
 
 async def setup(bot):
     await bot.add_cog(WordleCommands(bot))
\ No newline at end of file
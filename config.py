@@ -16,7 +16,20 @@ def load_config():
         "streak_start_date": "2025-01-01",
         "season_name": "Season 1",
         "min_games_for_leaderboard": 5, # <--- Added this to defaults!
-        "timezone_offset": 0
+        "timezone_offset": 0,
+        "snapshot_interval": 50,
+        "render_workers": 2,
+        "render_queue_size": 4,
+        "render_cache_mb": 32,
+        "render_cache_dir": "",
+        "rescan_partitions": 8,
+        "rescan_concurrency": 3,
+        "data_dir": "wordle_data",
+        "metrics_file": "",
+        "metrics_port": 0,
+        "metrics_interval": 60,
+        "export_port": 0,
+        "prewarm": True
     }
     
     if not os.path.exists(CONFIG_FILE):
@@ -47,7 +60,20 @@ def parse_config(raw):
         "STREAK_START_DATE": start_date,
         "SEASON_NAME": raw.get("season_name", "Season 1"),
         "MIN_GAMES": int(raw.get("min_games_for_leaderboard", 5)), # <--- THE FIX
-        "TZ": timezone(timedelta(hours=raw.get("timezone_offset", 0)))
+        "TZ": timezone(timedelta(hours=raw.get("timezone_offset", 0))),
+        "SNAPSHOT_INTERVAL": int(raw.get("snapshot_interval", 50)),
+        "RENDER_WORKERS": int(raw.get("render_workers", 2)),
+        "RENDER_QUEUE_SIZE": int(raw.get("render_queue_size", 4)),
+        "RENDER_CACHE_MB": int(raw.get("render_cache_mb", 32)),
+        "RENDER_CACHE_DIR": raw.get("render_cache_dir", ""),
+        "RESCAN_PARTITIONS": int(raw.get("rescan_partitions", 8)),
+        "RESCAN_CONCURRENCY": int(raw.get("rescan_concurrency", 3)),
+        "DATA_DIR": raw.get("data_dir", "wordle_data"),
+        "METRICS_FILE": raw.get("metrics_file", ""),
+        "METRICS_PORT": int(raw.get("metrics_port", 0)),
+        "METRICS_INTERVAL": float(raw.get("metrics_interval", 60)),
+        "EXPORT_PORT": int(raw.get("export_port", 0)),
+        "PREWARM": bool(raw.get("prewarm", True))
     }
 
 CONFIG = load_config()
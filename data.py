@@ -1,23 +1,96 @@
 import os
 import json
+import bisect
 import asyncio
 import logging
 import time
+import threading
 import discord
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable, Tuple, Set, TYPE_CHECKING
+from collections.abc import Mapping
 from config import CONFIG
-from utils import parse_wordle_message, get_smart_name_map
+from utils import parse_wordle_message
+from names import get_smart_name_map
+import storage
+import rescan
+import metrics
+
+# scores pulls in numpy, so it's imported when the first shard loads (or by the startup prewarm)
+if TYPE_CHECKING:
+    from scores import ScoreMatrix
 
 logger = logging.getLogger("data")
 
-CACHE_FILE = "wordle_cache.json"
-CACHE_LOCK = asyncio.Lock()
-CACHE_TTL = 60
-_last_update_time = 0
+CACHE_FILE = "wordle_cache.bin"
+JOURNAL_FILE = "wordle_journal.ndjson"
+# Snapshots written before the binary format; converted on first load
+JSON_CACHE_FILE = "wordle_cache.json"
+# Pre-sharding single-server files in the working directory (adopted by their guild's shard on first load)
+LEGACY_CACHE_FILE = JSON_CACHE_FILE
+LEGACY_JOURNAL_FILE = JOURNAL_FILE
+# Index of a shard's closed seasons (name, archive file, final standings); archives sit next to it
+SEASONS_FILE = "seasons.json"
+# Progress of an interrupted /rescan, so the next one resumes (removed once the rebuild is on disk)
+RESCAN_CHECKPOINT_FILE = "rescan_checkpoint.json"
+ARCHIVE_CACHE_SIZE = 2  # archived seasons kept in memory after a lookup
+
+class Shard:
+    """
+    Everything the bot keeps for one (guild, channel): its files, lock, refresh state and in-memory copy.
+    Shards share nothing, so servers refresh in parallel, and a shard's files are only read on first use.
+    """
+    def __init__(self, guild_id: int, channel_id: int):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        # Prefix for anything keyed on this shard's versions (e.g. the render cache)
+        self.scope = f"{guild_id}-{channel_id}"
+        self.directory = os.path.join(CONFIG["DATA_DIR"], str(guild_id), str(channel_id))
+        self.cache_file = os.path.join(self.directory, CACHE_FILE)
+        self.json_cache_file = os.path.join(self.directory, JSON_CACHE_FILE)
+        self.journal_file = os.path.join(self.directory, JOURNAL_FILE)
+        self.seasons_file = os.path.join(self.directory, SEASONS_FILE)
+        self.checkpoint_file = os.path.join(self.directory, RESCAN_CHECKPOINT_FILE)
+
+        self.lock = asyncio.Lock()
+        # Serializes the first load between the startup prewarm (a worker thread) and the event loop
+        self.load_lock = threading.Lock()
+        self.last_update_time = 0
+        # Live recaps are applied straight from on_message. A history scan is only needed to fill the gap
+        # after startup or a gateway disconnect, which is what this flag tracks.
+        self.caught_up = False
+        self.journal_entries = 0
+
+        # The in-process copy of the cache. Loaded lazily, mutated in place, persisted in the background.
+        self.cache: Optional[Dict[str, Any]] = None
+        # Columnar copy of cache["games"] for the analytics (see scores.ScoreMatrix)
+        self.matrix: Optional["ScoreMatrix"] = None
+        # Closed seasons (read from seasons.json on first use). Their games are only loaded on demand.
+        self.seasons: Optional[List[Dict[str, Any]]] = None
+        self.pending_records: List[Dict[str, Any]] = []
+        self.snapshot_requested = False
+        self.persist_task: Optional[asyncio.Task] = None
+        self.refresh_task: Optional[asyncio.Task] = None
+        self.rebuild_task: Optional[asyncio.Task] = None
+        # Edits and deletes seen while a rebuild scans (message id -> new game or None), replayed on its shadow
+        self.rebuild_corrections: Dict[int, Optional[Dict[str, Any]]] = {}
+
+_shards: Dict[Tuple[int, int], Shard] = {}
+_change_listeners: List[Callable[[str, int], None]] = []
+# Recently viewed archived seasons: (shard scope, archive file) -> view
+_archives: "OrderedDict[Tuple[str, str], CacheView]" = OrderedDict()
+# uids in the legacy cache and the id of its newest recap, read once to find the channel it belongs to
+# (uids empty once adopted / if absent)
+_legacy_uids: Optional[Set[str]] = None
+_legacy_probe_id: Optional[int] = None
+# Shards whose channel was checked against the legacy cache and doesn't hold its recaps
+_legacy_rejected: Set[str] = set()
 
 def get_empty_cache() -> Dict[str, Any]:
     # Added current_streak to track the highest streak found
-    return {"last_message_id": None, "games": [], "players": {}, "current_streak": 0}
+    return {"last_message_id": None, "games": [], "players": {}, "current_streak": 0, "version": 0,
+            "season": CONFIG["SEASON_NAME"], "rewrites": []}
 
 async def _scan_discord_history(channel: discord.TextChannel, 
                               start_id: Optional[int], 
@@ -37,25 +110,35 @@ async def _scan_discord_history(channel: discord.TextChannel,
         iterator = channel.history(limit=None, oldest_first=True, after=start_date)
 
     processed = 0
+    started = time.perf_counter()
     async for msg in iterator:
         processed += 1
         if processed % 500 == 0: logger.info(f"🔄 Scanning... {processed} messages.")
 
         if msg.created_at < start_date: continue
-        if msg.author.id != CONFIG["WORDLE_BOT_ID"]: continue
-
-        # Now unpacks BOTH results and the streak
-        results, streak = parse_wordle_message(msg.content, name_map, CONFIG["FAIL_PENALTY"])
-        if results:
-            new_games.append({
-                'id': msg.id,
-                'date': msg.created_at.timestamp(),
-                'scores': {uid: s for uid, s in results},
-                'streak': streak  # <--- NEW
-            })
-            
+        game = _parse_game(msg, name_map)
+        if game: new_games.append(game)
+    
+    metrics.observe("history_scan_seconds", time.perf_counter() - started, source="catch_up")
+    metrics.inc("history_messages_total", processed, source="catch_up")
+    # history() pages 100 messages per request and stops after the first short page
+    metrics.inc("api_requests_total", processed // 100 + 1, route="channel_history")
     return new_games
 
+def _parse_game(msg: discord.Message, name_map: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Turns an Official Wordle Bot recap into a game record (None for anything else)."""
+    if msg.author.id != CONFIG["WORDLE_BOT_ID"]: return None
+
+    # Now unpacks BOTH results and the streak
+    results, streak = parse_wordle_message(msg.content, name_map, CONFIG["FAIL_PENALTY"])
+    if not results: return None
+    return {
+        'id': msg.id,
+        'date': msg.created_at.timestamp(),
+        'scores': {uid: s for uid, s in results},
+        'streak': streak  # <--- NEW
+    }
+
 def _process_game_stats(cache, game):
     scores = list(game['scores'].values())
     if not scores: return
@@ -85,65 +168,621 @@ def _rebuild_stats(cache):
         _process_game_stats(cache, game)
     return cache
 
-async def load_cache():
-    if not os.path.exists(CACHE_FILE): return get_empty_cache()
+def _ingest_game(cache, game):
+    cache["games"].append(game)
+    _process_game_stats(cache, game)
+    
+    # Keep track of the highest streak number seen
+    if game.get("streak", 0) > cache.get("current_streak", 0):
+        cache["current_streak"] = game["streak"]
+    cache["last_message_id"] = game['id']
+    cache["version"] += 1
+
+def _unwind_stats(cache, games):
+    """Takes `games` (a suffix of cache["games"]) back out of the player stats, newest first."""
+    players = cache["players"]
+    for game in reversed(games):
+        for uid, score in game['scores'].items():
+            p = players[uid]
+            p["scores"].pop()
+            p["war_history"].pop()
+            # The running total after the previous game is exactly its war_history entry
+            p["total_war"] = p["war_history"][-1] if p["war_history"] else 0.0
+            p["total_score"] -= score
+            if score < CONFIG["FAIL_PENALTY"]: p["wins"] -= 1
+            p["games_played"] -= 1
+            if not p["games_played"]: del players[uid]
+
+def _correct_games(cache, matrix: "ScoreMatrix", changes: Dict[int, Optional[Dict[str, Any]]]) -> List[int]:
+    """
+    Replaces the game recorded for each message id with its new game (None removes it; a recap that only
+    now parses is inserted in place). The games from the oldest changed position on are unwound and replayed
+    once, in the player stats and the matrix alike, so a batch of corrections costs the games after the
+    oldest one, not the whole history. Returns the ids whose games actually changed (oldest first).
+    They go to cache["rewrites"], the log export clients check to tell whether games they already
+    synced were changed behind their cursor.
+    """
+    games = cache["games"]
+    start, changed = len(games), {}
+    for message_id, game in changes.items():
+        pos = bisect.bisect_left(games, message_id, key=lambda g: g['id'])
+        old = games[pos] if pos < len(games) and games[pos]['id'] == message_id else None
+        if old is None and game is None: continue
+        if old is not None and game is not None and old['scores'] == game['scores'] and old.get('streak') == game.get('streak'):
+            continue
+        start = min(start, pos)
+        changed[message_id] = (old, game)
+    if not changed: return []
+
+    _unwind_stats(cache, games[start:])
+    matrix.truncate(start)
+    suffix = {g['id']: g for g in games[start:]}
+    for message_id, (_, game) in changed.items():
+        if game is None: del suffix[message_id]
+        else: suffix[message_id] = game
+    games[start:] = sorted(suffix.values(), key=lambda g: g['id'])
+    for g in games[start:]:
+        _process_game_stats(cache, g)
+        matrix.append_game(g)
+
+    # last_message_id is a scan cursor, so it stays put even if that recap was deleted
+    if any(old is not None and old.get("streak", 0) >= cache["current_streak"] for old, _ in changed.values()):
+        cache["current_streak"] = max((g.get("streak", 0) for g in games), default=0)
+    else:
+        cache["current_streak"] = max([cache["current_streak"]] + [g.get("streak", 0) for _, g in changed.values() if g])
+    cache["version"] += 1
+    cache["rewrites"].extend(sorted(changed))
+    return sorted(changed)
+
+def _correct_game(cache, matrix: "ScoreMatrix", message_id: int, game: Optional[Dict[str, Any]]) -> bool:
+    """Single-message _correct_games. Returns False if nothing changed."""
+    return bool(_correct_games(cache, matrix, {message_id: game}))
+
+def _read_store(shard: Shard) -> Tuple[Dict[str, Any], "ScoreMatrix"]:
+    """Loads the shard's snapshot, builds its matrix and replays the journal tail on top of both."""
+    path = shard.cache_file if os.path.exists(shard.cache_file) else shard.json_cache_file
+    snapshot, fmt, records = storage.load_store(path, shard.journal_file)
+    cache = snapshot if snapshot is not None else get_empty_cache()
+    
+    if "players" not in cache and fmt == "json":
+        logger.warning("⚠️ Old cache detected. Triggering migration.")
+        cache = _rebuild_stats(cache)
+    matrix = _build_matrix(cache["games"])
+    # Binary snapshots don't store the derived player stats; the matrix yields them in bulk
+    if "players" not in cache:
+        cache["players"] = matrix.player_stats()
+    if "current_streak" not in cache: cache["current_streak"] = 0
+    if "version" not in cache: cache["version"] = len(cache["games"])
+    if "rewrites" not in cache: cache["rewrites"] = []
+
+    # Snapshots from before season archiving don't name their season: it's the configured one, unless the
+    # config has already moved past their games. Stored right away, so the next rollover archives it by name.
+    closed = bool(cache["games"]) and cache["games"][0]['date'] < CONFIG["STREAK_START_DATE"].timestamp()
+    newly_labelled = "season" not in cache and not closed
+    if newly_labelled: cache["season"] = CONFIG["SEASON_NAME"]
+
+    if fmt == "json":
+        storage.write_snapshot(shard.cache_file, storage.encode_snapshot(cache))
+        if path != shard.cache_file: os.remove(path)
+        logger.info(f"🗜️ Converted {path} to the binary snapshot format.")
+    elif newly_labelled and snapshot is not None:
+        storage.write_snapshot(shard.cache_file, storage.encode_snapshot(cache))
+
+    # Anything at or before the snapshot cursor is already folded in
+    # (a crash between snapshot rename and journal truncation leaves duplicates)
+    replayed = 0
+    for record in records:
+        op = record.get("op")
+        if op == "add":
+            game = record["game"]
+            if cache["last_message_id"] and game['id'] <= cache["last_message_id"]: continue
+            _ingest_game(cache, game)
+            matrix.append_game(game)
+            replayed += 1
+        elif op in ("edit", "delete"):
+            # Idempotent, so a correction already in the snapshot is a no-op
+            game = record.get("game")
+            replayed += _correct_game(cache, matrix, game['id'] if game else record["id"], game)
+    
+    if replayed: logger.info(f"📜 Replayed {replayed} journaled games.")
+    shard.journal_entries = len(records)
+
+    if cache["games"] and cache["games"][0]['date'] < CONFIG["STREAK_START_DATE"].timestamp():
+        cache, matrix = _archive_closed_season(shard, cache)
+        shard.journal_entries = 0
+    cache["season"] = CONFIG["SEASON_NAME"]
+    return cache, matrix
+
+# --- Closed seasons ---
+def _read_seasons(shard: Shard) -> List[Dict[str, Any]]:
+    if shard.seasons is None:
+        try:
+            with open(shard.seasons_file, 'r') as f: shard.seasons = json.load(f)
+        except FileNotFoundError:
+            shard.seasons = []
+        except ValueError as e:
+            logger.error(f"❌ Unreadable season index {shard.seasons_file}: {e}")
+            shard.seasons = []
+    return shard.seasons
+
+def _archive_closed_season(shard: Shard, cache: Dict[str, Any]) -> Tuple[Dict[str, Any], "ScoreMatrix"]:
+    """
+    Freezes the games from before STREAK_START_DATE into a read-only archive (same binary format) and
+    records its final standings in seasons.json, so the live cache, its matrix and every later load or
+    rebuild only cover the current season. Returns the trimmed cache and its matrix.
+    """
+    start = CONFIG["STREAK_START_DATE"]
+    split = bisect.bisect_left(cache["games"], start.timestamp(), key=lambda g: g['date'])
+    closed, games = cache["games"][:split], cache["games"][split:]
+    seasons = _read_seasons(shard)
+
+    # A crash after writing the archive but before trimming the snapshot leaves it already archived
+    if not seasons or seasons[-1]["last_message_id"] != closed[-1]['id']:
+        name = cache.get("season") or "Previous Season"
+        if name == CONFIG["SEASON_NAME"] or any(s["name"] == name for s in seasons):
+            name = f"{name} (until {start:%Y-%m-%d})"
+        filename = f"season-{len(seasons) + 1}.bin"
+        archive = {"last_message_id": closed[-1]['id'], "games": closed, "version": 1, "season": name,
+                   "current_streak": max(g.get('streak', 0) for g in closed)}
+        os.makedirs(shard.directory, exist_ok=True)
+        storage.write_snapshot(os.path.join(shard.directory, filename), storage.encode_snapshot(archive))
+        seasons.append({"name": name, "file": filename, "start": closed[0]['date'], "end": start.timestamp(),
+                        "games": len(closed), "last_message_id": closed[-1]['id'],
+                        "standings": _build_matrix(closed).standings()})
+        storage.write_snapshot(shard.seasons_file, json.dumps(seasons, separators=(',', ':')))
+        logger.info(f"🗄️ Archived {len(closed)} games of {name} for shard {shard.scope}.")
+
+    cache["games"] = games
+    cache["current_streak"] = max((g.get('streak', 0) for g in games), default=0)
+    cache["version"] += 1
+    # 0 sits at or before every cursor: all synced copies are stale
+    cache["rewrites"].append(0)
+    matrix = _build_matrix(games)
+    cache["players"] = matrix.player_stats()
+    cache["season"] = CONFIG["SEASON_NAME"]
+    storage.compact(shard.cache_file, shard.journal_file, storage.encode_snapshot(cache))
+    return cache, matrix
+
+def list_seasons(channel: discord.abc.Messageable) -> List[Dict[str, Any]]:
+    """The channel's archived seasons, oldest first (index only: no games are loaded)."""
+    return _read_seasons(get_shard(channel))
+
+def find_season(channel: discord.abc.Messageable, name: str) -> Optional[Dict[str, Any]]:
+    return next((s for s in list_seasons(channel) if s["name"] == name), None)
+
+def _load_archive(shard: Shard, entry: Dict[str, Any]) -> Optional["CacheView"]:
+    archive, _ = storage.read_snapshot(os.path.join(shard.directory, entry["file"]))
+    if archive is None: return None
+    matrix = _build_matrix(archive["games"])
+    archive["players"] = matrix.player_stats()
+    # Its own scope: archives never change, so their rendered graphs stay cached
+    return CacheView(archive, matrix, f"{shard.scope}-{entry['file'].rsplit('.', 1)[0]}")
+
+async def load_season(channel: discord.abc.Messageable, name: str) -> Optional["CacheView"]:
+    """Read-only view of an archived season, loaded off the event loop on first use and kept in a small LRU."""
+    shard = get_shard(channel)
+    entry = find_season(channel, name)
+    if entry is None: return None
+    key = (shard.scope, entry["file"])
+    view = _archives.get(key)
+    if view is not None:
+        _archives.move_to_end(key)
+        return view
+
+    view = await asyncio.to_thread(_load_archive, shard, entry)
+    if view is None: return None
+    _archives[key] = view
+    while len(_archives) > ARCHIVE_CACHE_SIZE:
+        _archives.popitem(last=False)
+    return view
+
+async def _adopt_legacy_store(shard: Shard, channel: discord.TextChannel):
+    """
+    Moves the pre-sharding cache files into this shard if they came from its channel: at least one
+    of their players is a guild member, and the channel still holds the newest recap they recorded.
+    Runs from the catch-up refresh (shard lock held), so only channels that are actually scanned
+    for recaps can claim the files, and each channel is asked at most once.
+    """
+    global _legacy_uids, _legacy_probe_id
+    if _legacy_uids is None:
+        _legacy_uids = set()
+        legacy, _ = storage.read_snapshot(LEGACY_CACHE_FILE)
+        if legacy is not None and legacy.get("games"):
+            _legacy_uids = {uid for game in legacy["games"] for uid in game['scores']}
+            _legacy_probe_id = legacy["games"][-1]['id']
+    if not _legacy_uids or shard.scope in _legacy_rejected: return
+    if os.path.exists(shard.cache_file) or os.path.exists(shard.json_cache_file): return
+    # A shard that already holds games of its own (in memory, not yet persisted) keeps them
+    if shard.cache is not None and shard.cache["games"]: return
+    guild = getattr(channel, "guild", None)
+    if guild is None or not any(guild.get_member(int(uid)) for uid in _legacy_uids): return
+
     try:
-        with open(CACHE_FILE, 'r') as f:
-            data = json.load(f)
-            if "players" not in data: 
-                logger.warning("⚠️ Old cache detected. Triggering migration.")
-                data = _rebuild_stats(data)
-                with open(CACHE_FILE, 'w') as f2: json.dump(data, f2)
-            return data
+        probe = await channel.fetch_message(_legacy_probe_id)
+    except discord.HTTPException:
+        probe = None
+    if probe is None or probe.author.id != CONFIG["WORDLE_BOT_ID"]:
+        _legacy_rejected.add(shard.scope)
+        return
+
+    os.makedirs(shard.directory, exist_ok=True)
+    # Converted to the binary format when the shard loads
+    os.replace(LEGACY_CACHE_FILE, shard.json_cache_file)
+    if os.path.exists(LEGACY_JOURNAL_FILE):
+        os.replace(LEGACY_JOURNAL_FILE, shard.journal_file)
+    _legacy_uids = set()
+    logger.warning(f"📦 Adopted legacy {LEGACY_CACHE_FILE} into shard {shard.scope} ({guild.name} #{channel.name}).")
+
+    # Commands may have loaded this shard empty before the refresh got here: reload it from the adopted files
+    if shard.cache is not None:
+        old_version = shard.cache["version"]
+        shard.cache = shard.matrix = None
+        cache = _get_store(shard)
+        # Keep versions monotonic so nothing keyed on them serves the empty copy
+        cache["version"] = max(cache["version"], old_version + 1)
+        _notify_change(shard)
+
+def get_shard(channel: discord.abc.Messageable) -> Shard:
+    """Returns the channel's shard, creating it (but not loading it) on first use."""
+    guild = getattr(channel, "guild", None)
+    key = (guild.id if guild else 0, channel.id)
+    shard = _shards.get(key)
+    if shard is None:
+        shard = _shards[key] = Shard(*key)
+    return shard
+
+def shards() -> List[Shard]:
+    return list(_shards.values())
+
+class CacheView(Mapping):
+    """Read-only view of one shard's in-memory cache, stamped with the version it was taken at.
+    Readers must not mutate the nested lists/dicts (or the matrix); all writes go through this module."""
+    __slots__ = ("_cache", "version", "matrix", "scope")
+
+    def __init__(self, cache: Dict[str, Any], matrix: "ScoreMatrix", scope: str):
+        self._cache = cache
+        self.version = cache["version"]
+        self.matrix = matrix
+        self.scope = scope
+
+    @property
+    def tag(self) -> str:
+        """Version stamp that is unique across shards (versions alone are only unique per shard)."""
+        return f"{self.scope}.v{self.version}"
+
+    def game_row(self, message_id: int) -> Optional[int]:
+        """Row (in games and the matrix) of the game recorded for this message, or None."""
+        games = self._cache["games"]
+        row = bisect.bisect_left(games, message_id, key=lambda g: g['id'])
+        return row if row < len(games) and games[row]['id'] == message_id else None
+
+    def __getitem__(self, key): return self._cache[key]
+    def __iter__(self): return iter(self._cache)
+    def __len__(self): return len(self._cache)
+
+def _build_matrix(games: List[Dict[str, Any]]) -> "ScoreMatrix":
+    from scores import ScoreMatrix
+    return ScoreMatrix.from_games(games, CONFIG["FAIL_PENALTY"], CONFIG["MIN_GAMES"])
+
+def _load(shard: Shard) -> Tuple[Dict[str, Any], "ScoreMatrix"]:
+    """Reads a shard's cache from disk and builds its matrix (safe to run off the event loop)."""
+    started = time.perf_counter()
+    try:
+        cache, matrix = _read_store(shard)
     except Exception as e:
-        logger.error(f"❌ Corrupt cache file: {e}")
-        return get_empty_cache()
+        logger.error(f"❌ Corrupt cache file for shard {shard.scope}: {e}")
+        cache = get_empty_cache()
+        matrix = _build_matrix(cache["games"])
+    metrics.observe("cache_load_seconds", time.perf_counter() - started)
+    logger.info(f"📦 Cache loaded for shard {shard.scope}: {len(cache['games'])} games, {len(cache['players'])} players.")
+    return cache, matrix
 
-async def update_data(channel: discord.TextChannel, guild: discord.Guild, full_rescan: bool = False) -> Dict[str, Any]:
-    global _last_update_time
-    
-    async with CACHE_LOCK:
-        # 1. Load
-        if os.path.exists(CACHE_FILE):
-             with open(CACHE_FILE, 'r') as f: cache = json.load(f)
-        else: cache = get_empty_cache()
-            
-        # --- THE FIX IS HERE ---
-        # If we are doing a full rescan, we MUST wipe the old data first!
-        if full_rescan:
-            logger.info("Wiping old cache for a clean rescan...")
-            cache = get_empty_cache()
-        # -----------------------
+def _load_once(shard: Shard) -> bool:
+    """
+    Loads the shard unless it already is. Only one load ever runs per shard: the conversion, archiving
+    and snapshot writes in _read_store must not race each other. Returns False if it was already loaded.
+    """
+    with shard.load_lock:
+        # Whoever held the lock before us may have loaded it
+        if shard.cache is not None: return False
+        cache, matrix = _load(shard)
+        # Matrix first: lock-free readers take `cache is not None` to mean both are there
+        shard.matrix = matrix
+        shard.cache = cache
+        return True
+
+def _get_store(shard: Shard) -> Dict[str, Any]:
+    """Returns the shard's cache, loading it from disk on first use only (waiting for a prewarm in progress)."""
+    if shard.cache is None:
+        _load_once(shard)
+    return shard.cache
+
+async def preload(channel: discord.abc.Messageable) -> bool:
+    """Loads a channel's shard in a worker thread (startup prewarm). Returns False if it was already loaded."""
+    shard = get_shard(channel)
+    if shard.cache is not None: return False
+    return await asyncio.to_thread(_load_once, shard)
+
+def stored_channel_ids(guild_id: int) -> List[int]:
+    """Channels of a guild that have a shard on disk (without loading them)."""
+    try:
+        entries = os.scandir(os.path.join(CONFIG["DATA_DIR"], str(guild_id)))
+    except FileNotFoundError:
+        return []
+    with entries:
+        return [int(e.name) for e in entries if e.is_dir() and e.name.isdigit()]
+
+def _view(shard: Shard) -> CacheView:
+    return CacheView(_get_store(shard), shard.matrix, shard.scope)
+
+def get_cache(channel: discord.abc.Messageable) -> CacheView:
+    """Lock-free, disk-free (after first load) read of the channel's cache."""
+    return _view(get_shard(channel))
+
+def add_change_listener(callback: Callable[[str, int], None]):
+    """Registers a callback run with (shard scope, new version) whenever a shard's games change."""
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+
+def _notify_change(shard: Shard):
+    version = _get_store(shard)["version"]
+    for callback in _change_listeners:
+        try:
+            callback(shard.scope, version)
+        except Exception as e:
+            logger.error(f"❌ Cache change listener failed: {e}")
+
+def _schedule_persist(shard: Shard, records: List[Dict[str, Any]], snapshot: bool = False):
+    """Queues journal records (and optionally a full snapshot) for the shard's background writer."""
+    shard.pending_records.extend(records)
+    shard.snapshot_requested = shard.snapshot_requested or snapshot
+    if shard.persist_task is None or shard.persist_task.done():
+        shard.persist_task = asyncio.create_task(_persist_worker(shard))
+
+async def _persist_worker(shard: Shard):
+    """Drains queued writes off the event loop. Only one worker runs per shard, so its writes stay ordered."""
+    while shard.pending_records or shard.snapshot_requested:
+        batch = list(shard.pending_records)
+        shard.pending_records.clear()
+        snapshot = False
+        try:
+            # Shard directories are created on first write, so read-only lookups leave no trace on disk
+            os.makedirs(shard.directory, exist_ok=True)
+            if batch:
+                with metrics.timer("cache_save_seconds", kind="journal"):
+                    await asyncio.to_thread(storage.append_journal, shard.journal_file, batch)
+                shard.journal_entries += len(batch)
             
-        if "players" not in cache: cache = _rebuild_stats(cache)
-        if "current_streak" not in cache: cache["current_streak"] = 0
+            if shard.snapshot_requested or shard.journal_entries >= CONFIG["SNAPSHOT_INTERVAL"]:
+                logger.info(f"🗜️ Compacting {shard.journal_entries} journal entries into snapshot ({shard.scope}).")
+                snapshot, shard.snapshot_requested = True, False
+                with metrics.timer("cache_save_seconds", kind="snapshot"):
+                    payload = storage.encode_snapshot(_get_store(shard))
+                    await asyncio.to_thread(storage.compact, shard.cache_file, shard.journal_file, payload)
+                shard.journal_entries = 0
+        except Exception as e:
+            logger.error(f"❌ Failed to persist cache for shard {shard.scope}: {e}")
+            # Put the batch (and the snapshot request) back so the next write retries them
+            shard.pending_records[:0] = batch
+            shard.snapshot_requested = shard.snapshot_requested or snapshot
+            return
+
+async def _flush_shard(shard: Shard) -> bool:
+    """Waits for the shard's queued writes (retrying once). Returns False if some are still not on disk."""
+    while shard.persist_task is not None and not shard.persist_task.done():
+        await shard.persist_task
+    if shard.pending_records or shard.snapshot_requested:
+        _schedule_persist(shard, [])
+        await shard.persist_task
+    return not (shard.pending_records or shard.snapshot_requested)
+
+async def flush():
+    """Waits for every shard's queued writes to hit the disk (call on shutdown)."""
+    await asyncio.gather(*(_flush_shard(shard) for shard in shards()))
+
+@asynccontextmanager
+async def _locked(shard: Shard, op: str):
+    """Holds the shard lock, recording how long it took to get it."""
+    started = time.perf_counter()
+    async with shard.lock:
+        metrics.observe("cache_lock_wait_seconds", time.perf_counter() - started, op=op)
+        yield
+
+def _log_refresh_failure(task: asyncio.Task):
+    # Background refreshes may have no awaiter, so surface their errors here
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Cache refresh failed: {task.exception()}")
+
+def mark_stale():
+    """Called on gateway disconnect: recaps may have been missed, so each shard's next refresh scans history."""
+    stale = [shard for shard in shards() if shard.caught_up]
+    if stale: logger.info(f"🔌 Disconnected; {len(stale)} shard(s) will catch up from channel history on next refresh.")
+    for shard in stale:
+        shard.caught_up = False
+
+def _apply_new_games(shard: Shard, new_games):
+    """Ingests games into the shard's cache + matrix, queues them for the journal and notifies listeners."""
+    cache = _get_store(shard)
+    for game in new_games:
+        _ingest_game(cache, game)
+        shard.matrix.append_game(game)
+    _schedule_persist(shard, [{"op": "add", "game": g} for g in new_games])
+    _notify_change(shard)
+
+async def ingest_message(message: discord.Message) -> Optional["CacheView"]:
+    """
+    Applies a live recap to its channel's shard directly, with no Discord API round-trip.
+    Returns None if the shard isn't caught up yet; the caller should fall back to update_data.
+    """
+    shard = get_shard(message.channel)
+    async with _locked(shard, "ingest"):
+        if not shard.caught_up: return None
+        cache = _get_store(shard)
+
+        # A catch-up scan may already have picked this one up
+        last_id = cache["last_message_id"]
+        if last_id and message.id <= last_id: return _view(shard)
+        if message.created_at < CONFIG["STREAK_START_DATE"]: return _view(shard)
 
-        # 2. Debounce
-        now = time.time()
-        if not full_rescan and (now - _last_update_time < CACHE_TTL):
-            return cache
+        game = _parse_game(message, get_smart_name_map(message.guild))
+        if game:
+            logger.info(f"📥 Ingested live recap {message.id} ({len(game['scores'])} scores, shard {shard.scope}).")
+            _apply_new_games(shard, [game])
+        return _view(shard)
 
-        # 3. Scan
+async def correct_message(channel: discord.abc.Messageable, message_id: int,
+                          message: Optional[discord.Message] = None) -> Optional["CacheView"]:
+    """
+    Applies an edited (message given) or deleted (message=None) recap to its channel's shard,
+    re-parsing it with the current name map. Messages past the scan cursor are left to the next
+    catch-up scan, which reads them as they are now. Returns None if no recorded game changed.
+    """
+    return await _correct_messages(channel, {message_id: message})
+
+async def delete_messages(channel: discord.abc.Messageable, message_ids: List[int]) -> Optional["CacheView"]:
+    """correct_message for a bulk delete: all recaps are removed with a single unwind and replay."""
+    return await _correct_messages(channel, dict.fromkeys(message_ids))
+
+async def _correct_messages(channel: discord.abc.Messageable,
+                            messages: Dict[int, Optional[discord.Message]]) -> Optional["CacheView"]:
+    shard = get_shard(channel)
+    # Edits and deletes arrive for every channel; don't load (or create) shards that were never stored
+    if shard.cache is None and not any(os.path.exists(p) for p in (shard.cache_file, shard.json_cache_file, shard.journal_file)):
+        return None
+
+    async with _locked(shard, "correct"):
+        cache = _get_store(shard)
+        last_id = cache["last_message_id"] or 0
+        name_map = get_smart_name_map(channel.guild)
+        changes = {}
+        for message_id, message in messages.items():
+            # Archived seasons are read-only
+            if discord.utils.snowflake_time(message_id) < CONFIG["STREAK_START_DATE"]: continue
+            changes[message_id] = _parse_game(message, name_map) if message is not None else None
+
+        # A running rebuild may already have scanned these messages: its shadow gets them at the swap
+        if shard.rebuild_task is not None and not shard.rebuild_task.done():
+            shard.rebuild_corrections.update(changes)
+        changed = _correct_games(cache, shard.matrix, {m: g for m, g in changes.items() if m <= last_id})
+        if not changed: return None
+        for message_id in changed:
+            logger.info(f"✏️ {'Re-parsed edited' if changes[message_id] else 'Removed'} recap {message_id} (shard {shard.scope}).")
+        _schedule_persist(shard, [{"op": "edit", "game": changes[m]} if changes[m] else {"op": "delete", "id": m}
+                                  for m in changed])
+        _notify_change(shard)
+        return _view(shard)
+
+async def update_data(channel: discord.TextChannel, guild: discord.Guild,
+                      full_rescan: bool = False, allow_stale: bool = False) -> CacheView:
+    """
+    Brings the channel's cache up to date and returns a view of it.
+    Once a catch-up scan has run, live recaps (ingest_message) keep the cache current and
+    this returns immediately; history is only scanned again after a disconnect.
+    Concurrent callers share one in-flight refresh per shard instead of queueing on its lock;
+    different shards refresh independently.
+    With allow_stale=True the current snapshot is returned immediately and any due
+    refresh runs in the background (unless the cache has never been refreshed).
+    """
+    if full_rescan:
+        return await rebuild(channel, guild)
+
+    shard = get_shard(channel)
+    # 1. Already caught up? Live recaps keep us current (no lock, no disk, no API)
+    if shard.caught_up:
+        return _view(shard)
+
+    # 2. Single-flight: join the refresh that's already running, or start one
+    if shard.refresh_task is None or shard.refresh_task.done():
+        shard.refresh_task = asyncio.create_task(_refresh(shard, channel, guild))
+        shard.refresh_task.add_done_callback(_log_refresh_failure)
+    
+    if allow_stale and shard.last_update_time:
+        return _view(shard)
+    # Shielded so one caller giving up doesn't cancel the refresh for everybody else
+    return await asyncio.shield(shard.refresh_task)
+
+async def _refresh(shard: Shard, channel: discord.TextChannel, guild: discord.Guild) -> CacheView:
+    async with _locked(shard, "refresh"):
+        # Someone else may have refreshed while we waited for the lock
+        if shard.caught_up:
+            return _view(shard)
+
+        await _adopt_legacy_store(shard, channel)
+        cache = _get_store(shard)
         name_map = get_smart_name_map(guild)
-        last_id = None if full_rescan else cache["last_message_id"]
-        
-        new_games = await _scan_discord_history(channel, last_id, CONFIG["STREAK_START_DATE"], name_map)
+        new_games = await _scan_discord_history(channel, cache["last_message_id"], CONFIG["STREAK_START_DATE"], name_map)
 
-        # 4. Save
+        # Apply in memory, persist in the background
         if new_games:
-            logger.info(f"✅ Found {len(new_games)} new games.")
-            for game in new_games:
-                cache["games"].append(game)
-                _process_game_stats(cache, game)
-                
-                # Keep track of the highest streak number seen
-                if game.get("streak", 0) > cache.get("current_streak", 0):
-                    cache["current_streak"] = game["streak"]
-            
-            if new_games:
-                cache["last_message_id"] = new_games[-1]['id']
-            
-            with open(CACHE_FILE, 'w') as f: json.dump(cache, f, indent=4)
+            logger.info(f"✅ Found {len(new_games)} new games ({shard.scope}).")
+            _apply_new_games(shard, new_games)
         
-        _last_update_time = time.time()
-        return cache
\ No newline at end of file
+        shard.last_update_time = time.time()
+        shard.caught_up = True
+        return _view(shard)
+
+def is_rebuilding(channel: discord.abc.Messageable) -> bool:
+    task = get_shard(channel).rebuild_task
+    return task is not None and not task.done()
+
+async def rebuild(channel: discord.TextChannel, guild: discord.Guild,
+                  progress: Optional[rescan.ScanProgress] = None) -> CacheView:
+    """
+    Full rescan into a shadow cache while commands keep serving the current one.
+    Only one rebuild runs per shard at a time; a second caller joins the first.
+    """
+    shard = get_shard(channel)
+    if not is_rebuilding(channel):
+        shard.rebuild_task = asyncio.create_task(_rebuild(shard, channel, guild, progress or rescan.ScanProgress()))
+    return await asyncio.shield(shard.rebuild_task)
+
+async def _rebuild(shard: Shard, channel: discord.TextChannel, guild: discord.Guild,
+                   progress: rescan.ScanProgress) -> CacheView:
+    logger.info(f"♻️ Rebuilding cache for shard {shard.scope} from full history (shadow copy)...")
+    shard.rebuild_corrections.clear()
+
+    # 1. Scan without holding the shard lock: live data keeps being served and ingested
+    name_map = get_smart_name_map(guild)
+    games = await rescan.scan_full_history(channel, CONFIG["STREAK_START_DATE"],
+                                           lambda msg: _parse_game(msg, name_map), shard.checkpoint_file, progress)
+    shadow = get_empty_cache()
+    for game in games:
+        _ingest_game(shadow, game)
+
+    async with _locked(shard, "rebuild"):
+        # 2. Pick up anything that arrived after the scan passed it
+        tail = await _scan_discord_history(channel, shadow["last_message_id"], CONFIG["STREAK_START_DATE"], name_map)
+        for game in tail:
+            _ingest_game(shadow, game)
+            progress.record(game)
+
+        # 3. Edits and deletes made while the scan ran only reached the live cache. Anything past the
+        # shadow's cursor was read by the tail scan as it is now.
+        matrix = _build_matrix(shadow["games"])
+        corrections = {m: g for m, g in shard.rebuild_corrections.items() if m <= (shadow["last_message_id"] or 0)}
+        shard.rebuild_corrections.clear()
+        if _correct_games(shadow, matrix, corrections):
+            logger.info(f"✏️ Replayed {len(corrections)} correction(s) made during the rebuild ({shard.scope}).")
+
+        # 4. Swap in memory. Versions stay monotonic so nothing keyed on them confuses old and new data.
+        shadow["version"] = _get_store(shard)["version"] + 1
+        # Any game may have changed, so every export cursor has to start over
+        shadow["rewrites"] = shard.cache["rewrites"] + [0]
+        shard.cache = shadow
+        shard.matrix = matrix
+        shard.last_update_time = time.time()
+        shard.caught_up = True
+
+        # 5. ...and on disk: the journal describes the old cache, so one atomic snapshot replaces both
+        shard.pending_records.clear()
+        _schedule_persist(shard, [], snapshot=True)
+        _notify_change(shard)
+        saved = await _flush_shard(shard)
+
+    # Only forget the rescan checkpoint once its result is safely on disk. Until then a restart loads the
+    # old snapshot and journal, and the kept checkpoint lets the next /rescan resume instead of starting over.
+    if not saved:
+        raise RuntimeError("the rebuilt cache could not be written to disk (it is served from memory until a later write succeeds)")
+    rescan.clear_checkpoint(shard.checkpoint_file)
+    logger.info(f"✅ Rebuild swapped in for shard {shard.scope}: {len(shadow['games'])} games, {len(shadow['players'])} players.")
+    return _view(shard)
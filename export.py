@@ -0,0 +1,205 @@
+import io
+import csv
+import json
+import bisect
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Tuple, Optional, Callable
+from config import CONFIG
+import data
+import analytics
+import metrics
+
+logger = logging.getLogger("export")
+
+# Games written per chunk of a streamed /games response
+STREAM_CHUNK = 500
+CSV_COLUMNS = ["game_id", "date", "streak", "uid", "score"]
+
+# (shard scope, route) -> (cache tag it was built from, JSON body)
+_payloads: Dict[Tuple[str, str], Tuple[str, bytes]] = {}
+_runner = None
+_bot = None
+
+def _etag(view: data.CacheView) -> str:
+    # The cache tag changes on every ingest, correction and rebuild, and only then
+    return f'"{view.tag}"'
+
+def _not_modified(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    return any(tag.strip() in (etag, f"W/{etag}", "*") for tag in header.split(",")) if header else False
+
+def _display_name(guild, uid: str) -> str:
+    member = guild.get_member(int(uid)) if guild else None
+    return member.display_name if member else f"ID: {uid}"
+
+# --- Precomputed JSON bodies (built once per cache version) ---
+def _timelines(view: data.CacheView, guild) -> Dict[str, Any]:
+    players = {}
+    for uid in view.matrix.uids:
+        rows, wars = view.matrix.timeline(uid)
+        if not len(rows): continue
+        players[uid] = {"name": _display_name(guild, uid), "games": (rows + 1).tolist(), "war": wars.tolist()}
+    return {"version": view.tag, "season": view["season"], "games": view.matrix.n_games, "players": players}
+
+def _leaderboard(view: data.CacheView, guild) -> Dict[str, Any]:
+    return {"version": view.tag, "season": view["season"], "games": view.matrix.n_games,
+            "min_games": CONFIG["MIN_GAMES"], "players": analytics.get_leaderboard_stats(guild, view)}
+
+def _payload(view: data.CacheView, route: str, build: Callable[[], Dict[str, Any]]) -> bytes:
+    key = (view.scope, route)
+    cached = _payloads.get(key)
+    if cached is None or cached[0] != view.tag:
+        cached = _payloads[key] = (view.tag, json.dumps(build(), separators=(',', ':')).encode())
+    return cached[1]
+
+# --- Games stream ---
+def _ndjson_chunk(games: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(g, separators=(',', ':')) + "\n" for g in games).encode()
+
+def _csv_chunk(games: List[Dict[str, Any]], header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header: writer.writerow(CSV_COLUMNS)
+    for game in games:
+        date = datetime.fromtimestamp(game['date'], CONFIG["TZ"]).isoformat()
+        for uid, score in game['scores'].items():
+            writer.writerow([game['id'], date, game.get('streak', 0), uid, score])
+    return buf.getvalue().encode()
+
+# --- HTTP ---
+async def _resolve(request) -> Tuple[Optional[Any], Optional[data.CacheView]]:
+    """(channel, up-to-date cache view) for the request's channel, or (None, None) if it has no stored data."""
+    from aiohttp import web
+    try:
+        channel = _bot.get_channel(int(request.match_info["channel_id"]))
+    except ValueError:
+        channel = None
+    guild = getattr(channel, "guild", None)
+    # Only channels the bot already tracks: an HTTP request must never start a scan of a new channel
+    if guild is None or channel.id not in data.stored_channel_ids(guild.id):
+        raise web.HTTPNotFound(text="Unknown channel")
+    return channel, await data.update_data(channel, guild, allow_stale=True)
+
+def _json_response(body: bytes, etag: str):
+    from aiohttp import web
+    return web.Response(body=body, content_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def _observed(route: str):
+    def wrap(handler):
+        async def run(request):
+            from aiohttp import web
+            try:
+                response = await handler(request)
+            except web.HTTPException as e:
+                metrics.inc("export_requests_total", route=route, status=e.status)
+                raise
+            metrics.inc("export_requests_total", route=route, status=response.status)
+            return response
+        return run
+    return wrap
+
+@_observed("channels")
+async def _handle_channels(request):
+    from aiohttp import web
+    channels = []
+    for guild in _bot.guilds:
+        for channel_id in data.stored_channel_ids(guild.id):
+            channel = guild.get_channel(channel_id)
+            channels.append({"guild_id": str(guild.id), "guild": guild.name, "channel_id": str(channel_id),
+                             "channel": channel.name if channel else None,
+                             "seasons": [s["name"] for s in data.list_seasons(channel)] if channel else []})
+    return web.json_response({"channels": channels})
+
+@_observed("games")
+async def _handle_games(request):
+    """
+    Games as NDJSON (default, one stored game per line) or CSV (?format=csv, one row per score),
+    oldest first. ?since=<cursor> returns only later games; X-Next-Cursor is the cursor for the next sync.
+    A cursor is "<message id>:<rewrite count>". If an edit, delete or rebuild changed games at or before it
+    since it was issued, the client's copy is stale and it gets a 409 instead: resync without since.
+    """
+    from aiohttp import web
+    fmt = request.query.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise web.HTTPBadRequest(text="format must be ndjson or csv")
+    try:
+        # A bare message id is accepted too, and checked against every rewrite
+        since, _, seen = request.query.get("since", "0").partition(":")
+        since, seen = int(since), int(seen or 0)
+    except ValueError:
+        raise web.HTTPBadRequest(text="since must be an X-Next-Cursor value")
+
+    _, view = await _resolve(request)
+    etag = _etag(view)
+    if _not_modified(request, etag):
+        return web.Response(status=304, headers={"ETag": etag})
+    rewrites = view["rewrites"]
+    if since and (seen > len(rewrites) or any(message_id <= since for message_id in rewrites[seen:])):
+        raise web.HTTPConflict(text="Games at or before the cursor changed; resync without since",
+                               headers={"ETag": etag})
+
+    # Slice now: later ingests append to (and corrections replace items in) the live list, not this copy
+    games = view["games"]
+    games = games[bisect.bisect_right(games, since, key=lambda g: g['id']):]
+    cursor = games[-1]['id'] if games else since
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson",
+        "ETag": etag, "Cache-Control": "no-cache", "X-Next-Cursor": f"{cursor}:{len(rewrites)}"})
+    await response.prepare(request)
+    for start in range(0, len(games), STREAM_CHUNK):
+        chunk = games[start:start + STREAM_CHUNK]
+        await response.write(_csv_chunk(chunk, start == 0) if fmt == "csv" else _ndjson_chunk(chunk))
+    if fmt == "csv" and not games:
+        await response.write(_csv_chunk([], True))
+    await response.write_eof()
+    return response
+
+@_observed("timelines")
+async def _handle_timelines(request):
+    """Per-player cumulative WAR after each game they played (game numbers are 1-based)."""
+    from aiohttp import web
+    channel, view = await _resolve(request)
+    etag = _etag(view)
+    if _not_modified(request, etag):
+        return web.Response(status=304, headers={"ETag": etag})
+    return _json_response(_payload(view, "timelines", lambda: _timelines(view, channel.guild)), etag)
+
+@_observed("leaderboard")
+async def _handle_leaderboard(request):
+    from aiohttp import web
+    channel, view = await _resolve(request)
+    etag = _etag(view)
+    if _not_modified(request, etag):
+        return web.Response(status=304, headers={"ETag": etag})
+    return _json_response(_payload(view, "leaderboard", lambda: _leaderboard(view, channel.guild)), etag)
+
+async def start(bot):
+    """Starts the export API on 127.0.0.1:EXPORT_PORT (off when the port is 0)."""
+    global _runner, _bot
+    if not CONFIG["EXPORT_PORT"] or _runner is not None: return
+    from aiohttp import web
+    _bot = bot
+    app = web.Application()
+    app.router.add_get("/api/channels", _handle_channels)
+    app.router.add_get("/api/channels/{channel_id}/games", _handle_games)
+    app.router.add_get("/api/channels/{channel_id}/timelines", _handle_timelines)
+    app.router.add_get("/api/channels/{channel_id}/leaderboard", _handle_leaderboard)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    try:
+        # Local only, like the metrics endpoint: put a reverse proxy in front to publish it
+        await web.TCPSite(_runner, "127.0.0.1", CONFIG["EXPORT_PORT"]).start()
+    except OSError as e:
+        logger.error(f"❌ Could not start export API on port {CONFIG['EXPORT_PORT']}: {e}")
+        await _runner.cleanup()
+        _runner = None
+        return
+    logger.info(f"📤 Serving export API on http://127.0.0.1:{CONFIG['EXPORT_PORT']}/api/channels")
+
+async def stop():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+    _payloads.clear()
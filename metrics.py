@@ -0,0 +1,202 @@
+import time
+import bisect
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, Tuple, Optional
+from config import CONFIG
+import storage
+
+logger = logging.getLogger("metrics")
+
+PREFIX = "wordle_"
+# Seconds. Wide enough for an autocomplete (ms) and a full /rescan scan (minutes).
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus semantics): O(log buckets) per observation, constant memory."""
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max: self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (the observed max for the +Inf bucket)."""
+        if not self.count: return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+_histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_help: Dict[str, str] = {}
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def describe(name: str, text: str):
+    """HELP text for the Prometheus output."""
+    _help[name] = text
+
+def observe(name: str, value: float, **labels):
+    series = _histograms.setdefault(name, {})
+    key = _key(labels)
+    hist = series.get(key)
+    if hist is None:
+        hist = series[key] = Histogram()
+    hist.observe(value)
+
+def inc(name: str, amount: float = 1, **labels):
+    series = _counters.setdefault(name, {})
+    key = _key(labels)
+    series[key] = series.get(key, 0) + amount
+
+@contextmanager
+def timer(name: str, **labels):
+    """Observes the wall time of the block (works around awaits too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def get_counter(name: str, **labels) -> float:
+    return _counters.get(name, {}).get(_key(labels), 0)
+
+def get_histogram(name: str, **labels) -> Optional[Histogram]:
+    return _histograms.get(name, {}).get(_key(labels))
+
+def reset():
+    _histograms.clear()
+    _counters.clear()
+
+# --- Output ---
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for name in sorted(_counters):
+        full = PREFIX + name
+        if name in _help: lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} counter")
+        for key, value in sorted(_counters[name].items()):
+            lines.append(f"{full}{_format_labels(key)} {value:g}")
+    for name in sorted(_histograms):
+        full = PREFIX + name
+        if name in _help: lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} histogram")
+        for key, hist in sorted(_histograms[name].items()):
+            cumulative = 0
+            for bound, n in zip(hist.buckets, hist.counts):
+                cumulative += n
+                lines.append(f"{full}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{full}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+            lines.append(f"{full}_sum{_format_labels(key)} {hist.sum:.6f}")
+            lines.append(f"{full}_count{_format_labels(key)} {hist.count}")
+    return "\n".join(lines) + "\n"
+
+def _label_text(key: LabelKey) -> str:
+    return ",".join(v for _, v in key)
+
+def render_summary() -> str:
+    """Compact human-readable table for /botmetrics."""
+    lines = [f"{'HISTOGRAM':<40} {'N':>6} {'P50':>8} {'P95':>8} {'MAX':>8}"]
+    for name in sorted(_histograms):
+        for key, hist in sorted(_histograms[name].items()):
+            label = f"{name}[{_label_text(key)}]" if key else name
+            lines.append(f"{label[:40]:<40} {hist.count:>6} {_ms(hist.quantile(0.5)):>8} "
+                         f"{_ms(hist.quantile(0.95)):>8} {_ms(hist.max):>8}")
+    lines.append("")
+    lines.append(f"{'COUNTER':<40} {'VALUE':>12}")
+    for name in sorted(_counters):
+        for key, value in sorted(_counters[name].items()):
+            label = f"{name}[{_label_text(key)}]" if key else name
+            lines.append(f"{label[:40]:<40} {value:>12,.0f}")
+    return "\n".join(lines)
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}ms" if seconds < 10 else f"{seconds:.0f}s"
+
+# --- Exporters (both optional, off by default) ---
+_export_task: Optional[asyncio.Task] = None
+_http_runner = None
+
+async def _write_file_loop(path: str, interval: float):
+    while True:
+        try:
+            # World-readable: the textfile collector usually runs as a different user
+            await asyncio.to_thread(storage.write_snapshot, path, render_prometheus(), 0o644)
+        except Exception as e:
+            logger.error(f"❌ Could not write metrics file {path}: {e}")
+        await asyncio.sleep(interval)
+
+async def _start_http(port: int):
+    global _http_runner
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Prometheus-Format": "0.0.4"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    _http_runner = web.AppRunner(app)
+    await _http_runner.setup()
+    # Local only: anything remote should go through a scraper/proxy on this host
+    await web.TCPSite(_http_runner, "127.0.0.1", port).start()
+    logger.info(f"📈 Serving metrics on http://127.0.0.1:{port}/metrics")
+
+async def start_exporters():
+    """Starts whichever of the textfile writer / HTTP endpoint is configured."""
+    global _export_task
+    if CONFIG["METRICS_FILE"] and _export_task is None:
+        _export_task = asyncio.create_task(_write_file_loop(CONFIG["METRICS_FILE"], CONFIG["METRICS_INTERVAL"]))
+        logger.info(f"📈 Writing metrics to {CONFIG['METRICS_FILE']} every {CONFIG['METRICS_INTERVAL']}s")
+    if CONFIG["METRICS_PORT"] and _http_runner is None:
+        try:
+            await _start_http(CONFIG["METRICS_PORT"])
+        except OSError as e:
+            logger.error(f"❌ Could not start metrics endpoint on port {CONFIG['METRICS_PORT']}: {e}")
+
+async def stop_exporters():
+    global _export_task, _http_runner
+    if _export_task is not None:
+        _export_task.cancel()
+        _export_task = None
+    if _http_runner is not None:
+        await _http_runner.cleanup()
+        _http_runner = None
+
+describe("startup_seconds", "Startup phases (config, imports, cog setup, login, background prewarm).")
+describe("command_seconds", "Slash command and autocomplete latency.")
+describe("cache_lock_wait_seconds", "Time spent waiting to acquire a shard's cache lock.")
+describe("history_scan_seconds", "Duration of channel history scans.")
+describe("history_messages_total", "Messages read from channel history.")
+describe("api_requests_total", "Discord API requests made by history scans (one per page of 100 messages).")
+describe("cache_load_seconds", "Time to load a shard's cache from disk.")
+describe("cache_save_seconds", "Time to write journal entries / compact snapshots.")
+describe("render_seconds", "Graph render latency end to end: queueing for a free worker plus the render itself (cache misses only).")
+describe("render_cache_requests_total", "Render cache lookups by result.")
+describe("export_requests_total", "Export API requests by route and HTTP status (304 = client already up to date).")
@@ -0,0 +1,180 @@
+import bisect
+import logging
+import discord
+from typing import Dict, List, Set, Callable, Iterable, Iterator, Optional
+from utils import clean_name
+
+logger = logging.getLogger("names")
+
+# Key kinds, strongest first. When two members share a key, the stronger kind wins
+# (someone's exact display name beats someone else's emoji-stripped one).
+DISPLAY, USERNAME, GLOBAL, CLEAN = range(4)
+
+def _member_keys(member: discord.Member) -> Dict[str, int]:
+    """Every lowercase form a member can be found by (display, user, global and cleaned names) → key kind."""
+    keys = {}
+    candidates = [(member.display_name, DISPLAY), (member.name, USERNAME),
+                  (member.global_name, GLOBAL), (clean_name(member.display_name), CLEAN)]
+    for name, kind in candidates:
+        if not name: continue
+        key = name.lower().strip()
+        if key and key not in keys:
+            keys[key] = kind
+    return keys
+
+class NameIndex:
+    """
+    Name → uid index for one guild, patched per member instead of rebuilt.
+    `name_map` is the plain dict the recap parser reads (one uid per key); keys claimed by
+    several members are kept in `collisions` instead of being silently overwritten.
+    For autocomplete, prefix lookups bisect into the sorted key list and substring lookups
+    scan it; both stop as soon as enough matches are found. Searches limited to a few
+    candidates (e.g. the players) only look at those candidates' keys.
+    """
+    def __init__(self):
+        self._keys: List[str] = []
+        self._owners: Dict[str, Dict[str, int]] = {}
+        self._member_keys: Dict[str, Dict[str, int]] = {}
+        self._display: Dict[str, str] = {}
+        self.name_map: Dict[str, str] = {}
+        self.collisions: Dict[str, Set[str]] = {}
+
+    def __contains__(self, uid: str) -> bool:
+        return uid in self._display
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    def display_name(self, uid: str) -> Optional[str]:
+        return self._display.get(uid)
+
+    def _resolve(self, key: str):
+        """Recomputes name_map/collisions for one key. Strongest kind wins; ties go to the latest member."""
+        owners = self._owners.get(key)
+        if not owners:
+            self.name_map.pop(key, None)
+            self.collisions.pop(key, None)
+            return
+        best_uid, best_kind = None, None
+        for uid, kind in owners.items():
+            if best_kind is None or kind <= best_kind:
+                best_uid, best_kind = uid, kind
+        self.name_map[key] = best_uid
+        if len(owners) > 1:
+            if key not in self.collisions:
+                logger.info(f"⚠️ Name collision on '{key}': {sorted(owners)} (resolving to {best_uid}).")
+            self.collisions[key] = set(owners)
+        else:
+            self.collisions.pop(key, None)
+
+    def _add_key(self, key: str, uid: str, kind: int):
+        owners = self._owners.get(key)
+        if owners is None:
+            owners = self._owners[key] = {}
+            bisect.insort(self._keys, key)
+        owners[uid] = kind
+        self._resolve(key)
+
+    def _drop_key(self, key: str, uid: str):
+        owners = self._owners.get(key)
+        if owners is None: return
+        owners.pop(uid, None)
+        if not owners:
+            del self._owners[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+        self._resolve(key)
+
+    def add_member(self, member: discord.Member):
+        """Indexes a member, or re-indexes them after a name change (touching only their own keys)."""
+        uid = str(member.id)
+        keys = _member_keys(member)
+        old_keys = self._member_keys.get(uid, {})
+        if keys == old_keys and self._display.get(uid) == member.display_name: return
+
+        for key in old_keys:
+            if key not in keys: self._drop_key(key, uid)
+        for key, kind in keys.items():
+            if old_keys.get(key) != kind: self._add_key(key, uid, kind)
+        self._member_keys[uid] = keys
+        self._display[uid] = member.display_name
+
+    def remove_member(self, uid: str):
+        for key in self._member_keys.pop(uid, []):
+            self._drop_key(key, uid)
+        self._display.pop(uid, None)
+
+    def _matches(self, query: str) -> Iterator[str]:
+        # 1. Prefix matches (contiguous run in the sorted list)
+        start = bisect.bisect_left(self._keys, query)
+        for i in range(start, len(self._keys)):
+            key = self._keys[i]
+            if not key.startswith(query): break
+            yield from self._owners[key]
+        if not query: return
+        # 2. Substring matches that aren't prefixes
+        for key in self._keys:
+            if query in key and not key.startswith(query):
+                yield from self._owners[key]
+
+    def _candidate_matches(self, query: str, candidates: Iterable[str]) -> Iterator[str]:
+        # Same order as _matches, over just the candidates' keys
+        keys = sorted((key, uid) for uid in candidates for key in self._member_keys.get(uid, ()))
+        prefixed = [uid for key, uid in keys if key.startswith(query)]
+        yield from prefixed
+        if not query: return
+        for key, uid in keys:
+            if query in key and not key.startswith(query):
+                yield uid
+
+    def search(self, query: str, limit: int = 25, accept: Callable[[str], bool] = lambda uid: True,
+               candidates: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Returns up to `limit` uids whose names start with (then contain) `query`.
+        With `candidates`, only those uids are considered, at a cost that follows their number
+        rather than the guild's member count.
+        """
+        results = []
+        if limit <= 0: return results
+        seen = set()
+        query = query.lower().strip()
+        matches = self._matches(query) if candidates is None else self._candidate_matches(query, candidates)
+        for uid in matches:
+            if uid in seen or not accept(uid): continue
+            seen.add(uid)
+            results.append(uid)
+            if len(results) >= limit: break
+        return results
+
+# --- Per-guild registry, kept current by the member event listeners ---
+_indexes: Dict[int, NameIndex] = {}
+
+def build_index(guild: discord.Guild) -> NameIndex:
+    """(Re)builds a guild's index from its full member list (startup / reconnect)."""
+    index = NameIndex()
+    for member in guild.members:
+        index.add_member(member)
+    _indexes[guild.id] = index
+    logger.info(f"🔎 Built name index for {guild.name} ({len(index)} members, {len(index.collisions)} collisions).")
+    return index
+
+def get_name_index(guild: discord.Guild) -> NameIndex:
+    """Returns the guild's index, building it from the member list on first use."""
+    index = _indexes.get(guild.id)
+    if index is None:
+        index = build_index(guild)
+    return index
+
+def get_smart_name_map(guild: discord.Guild) -> Dict[str, str]:
+    """Name → uid map for parsing recaps: maintained incrementally, no per-refresh member walk."""
+    return get_name_index(guild).name_map
+
+def member_changed(member: discord.Member):
+    """Join / nickname / profile change: re-index just this member."""
+    index = _indexes.get(member.guild.id)
+    if index is not None:
+        index.add_member(member)
+
+def member_removed(member: discord.Member):
+    index = _indexes.get(member.guild.id)
+    if index is not None:
+        index.remove_member(str(member.id))
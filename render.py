@@ -0,0 +1,234 @@
+import os
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from config import CONFIG
+import analytics
+import metrics
+
+logger = logging.getLogger("render")
+
+class RenderQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is at capacity."""
+
+class RenderService:
+    """
+    Runs matplotlib renders in a pool of worker processes so the event loop never touches pyplot.
+    Jobs take plain data and return PNG bytes. At most `workers + queue_size` jobs are admitted at once.
+    """
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 'spawn' keeps workers free of the parent's event loop and sockets
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"🎨 Started render pool with {self.workers} workers.")
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, fn, *args) -> bytes:
+        if self._pending >= self.capacity:
+            raise RenderQueueFull(f"🚦 The graph renderer is busy ({self._pending} jobs queued). Please try again in a moment.")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with metrics.timer("render_seconds", graph=fn.__name__):
+                return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM). Drop the pool so the next job gets a fresh one.
+            logger.error("❌ Render pool broke, restarting it on next request.")
+            self._pool = None
+            raise
+        finally:
+            self._pending -= 1
+
+    async def warm_up(self):
+        """Starts the workers and has them import matplotlib, so the first real graph doesn't pay for it."""
+        await asyncio.gather(*(self.submit(analytics.prewarm) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+class RenderCache:
+    """
+    LRU of rendered PNG bytes, bounded by total size.
+    Entries evicted from memory are optionally spilled to `spill_dir` and read back on a later hit.
+    Keys embed the shard's version tag ("<scope>.v<version>"), so a new game makes every older entry
+    for that shard unreachable; `invalidate` then drops them eagerly, leaving other shards' entries alone.
+    Spill writes and purges run in a background worker, one at a time and in order, off the event loop.
+    """
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._io_jobs: List[Callable[[], None]] = []
+        self._io_task: Optional[asyncio.Task] = None
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind: str, uids: List[str], tag: str, names: List[str]) -> str:
+        raw = repr((kind, tuple(sorted(uids)), tag, tuple(names)))
+        return f"{tag}-" + hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.png")
+
+    def _remember(self, key: str, png: bytes):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = png
+        self._size += len(png)
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            old_key, old_png = self._entries.popitem(last=False)
+            self._size -= len(old_png)
+            if self.spill_dir:
+                self._schedule_io(partial(_write_file, self._spill_path(old_key), old_png))
+
+    def _schedule_io(self, job: Callable[[], None]):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to protect (offline use): just do it
+            job()
+            return
+        self._io_jobs.append(job)
+        if self._io_task is None or self._io_task.done():
+            self._io_task = loop.create_task(self._io_worker())
+
+    async def _io_worker(self):
+        while self._io_jobs:
+            await asyncio.to_thread(self._io_jobs.pop(0))
+    async def get(self, key: str) -> Optional[bytes]:
+        png = self._entries.get(key)
+        if png is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc("render_cache_requests_total", result="hit")
+            return png
+        if self.spill_dir:
+            png = await asyncio.to_thread(_read_file, self._spill_path(key))
+            if png is not None:
+                self._remember(key, png)
+                self.hits += 1
+                metrics.inc("render_cache_requests_total", result="spill_hit")
+                return png
+        self.misses += 1
+        metrics.inc("render_cache_requests_total", result="miss")
+        return None
+
+    def put(self, key: str, png: bytes):
+        if len(png) <= self.max_bytes:
+            self._remember(key, png)
+
+    def invalidate(self, scope: str, version: int):
+        """Drops everything rendered against an older version of one shard."""
+        stale, keep = f"{scope}.", f"{scope}.v{version}-"
+        for key in [k for k in self._entries if k.startswith(stale) and not k.startswith(keep)]:
+            self._size -= len(self._entries.pop(key))
+        if self.spill_dir:
+            self._schedule_io(partial(_purge_dir, self.spill_dir, stale, keep))
+
+def _write_file(path: str, payload: bytes):
+    try:
+        with open(path, 'wb') as f: f.write(payload)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not spill render to {path}: {e}")
+
+def _read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f: return f.read()
+    except OSError:
+        return None
+
+def _purge_dir(path: str, stale_prefix: str, keep_prefix: str):
+    for entry in os.scandir(path):
+        if entry.name.endswith(".png") and entry.name.startswith(stale_prefix) and not entry.name.startswith(keep_prefix):
+            try: os.remove(entry.path)
+            except OSError: pass
+
+_service: Optional[RenderService] = None
+_cache: Optional[RenderCache] = None
+_inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+def get_service() -> RenderService:
+    global _service
+    if _service is None:
+        _service = RenderService(CONFIG["RENDER_WORKERS"], CONFIG["RENDER_QUEUE_SIZE"])
+    return _service
+
+def get_cache() -> RenderCache:
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(CONFIG["RENDER_CACHE_MB"] * 1024 * 1024, CONFIG["RENDER_CACHE_DIR"])
+    return _cache
+
+def invalidate_cache(scope: str, version: int):
+    """data change listener: new games make every cached graph of that shard stale."""
+    if _cache is not None:
+        _cache.invalidate(scope, version)
+
+async def _cached_render(key: str, fn, make_args: Callable[[], Tuple]) -> bytes:
+    """Serves `key` from the render cache, or renders it once even if several callers ask at the same time."""
+    cache = get_cache()
+    png = await cache.get(key)
+    if png is not None: return png
+
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        png = await get_service().submit(fn, *make_args())
+        cache.put(key, png)
+        future.set_result(png)
+        return png
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Nobody else may be waiting; don't let the loop warn about an unretrieved exception
+        future.exception()
+        raise
+    finally:
+        del _inflight[key]
+
+async def render_war_graph(uid: str, user_name: str, war_history: List[float], tag: str) -> bytes:
+    key = RenderCache.make_key("war", [uid], tag, [user_name])
+    return await _cached_render(key, analytics.generate_war_graph, lambda: (user_name, list(war_history)))
+
+async def render_comparison_graph(uids: List[str], names: Dict[str, str], tag: str,
+                                  build_series: Callable[[], Tuple[List[Dict[str, Any]], int]]) -> bytes:
+    """`build_series` is only called on a cache miss, so hits skip the per-game aggregation too."""
+    key = RenderCache.make_key("compare", uids, tag, [names[uid] for uid in sorted(uids)])
+    return await _cached_render(key, analytics.generate_comparison_graph, build_series)
+
+async def render_h2h_heatmap(uids: List[str], names: Dict[str, str], tag: str,
+                             build_grid: Callable[[], Dict[str, Any]]) -> bytes:
+    key = RenderCache.make_key("h2h", uids, tag, [names[uid] for uid in sorted(uids)])
+    return await _cached_render(key, analytics.generate_h2h_heatmap, lambda: (build_grid(),))
+
+def shutdown():
+    if _service is not None:
+        _service.shutdown()
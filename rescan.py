@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import discord
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+from config import CONFIG
+import storage
+import metrics
+
+logger = logging.getLogger("rescan")
+
+CHECKPOINT_EVERY = 500
+
+class ScanProgress:
+    """Live counters for a running rescan (read by the /rescan status message)."""
+    def __init__(self):
+        self.messages = 0
+        self.games = 0
+        self._resumed_messages = 0
+        self._started = time.monotonic()
+
+    def resume_from(self, messages: int, games: int):
+        self.messages = self._resumed_messages = messages
+        self.games = games
+
+    def record(self, game: Optional[Dict[str, Any]]):
+        self.messages += 1
+        if game: self.games += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    @property
+    def rate(self) -> float:
+        """Messages per second fetched by this run (resumed work excluded)."""
+        return (self.messages - self._resumed_messages) / max(self.elapsed, 1e-6)
+
+    def describe(self) -> str:
+        return f"{self.messages:,} messages scanned, {self.games:,} games found ({self.rate:.0f} msg/s, {self.elapsed:.0f}s)"
+
+def _partition(start_date: datetime, end_date: datetime, parts: int) -> List[Dict[str, Any]]:
+    """
+    Splits [start_date, end_date) into equal time slices, expressed as snowflake bounds.
+    The last slice is open-ended so messages posted during the scan are still picked up.
+    """
+    parts = max(1, parts)
+    span = (end_date - start_date) / parts
+    bounds = [discord.utils.time_snowflake(start_date + span * i) for i in range(parts)] + [None]
+    return [{"lo": bounds[i], "hi": bounds[i + 1], "cursor": None, "games": [], "scanned": 0, "done": False}
+            for i in range(parts)]
+
+def _load_checkpoint(path: str, channel_id: int, start_date: datetime) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path): return None
+    try:
+        with open(path, 'r') as f: checkpoint = json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable rescan checkpoint: {e}")
+        return None
+    if checkpoint.get("channel_id") != channel_id or checkpoint.get("start") != start_date.timestamp():
+        logger.info("Rescan checkpoint belongs to a different channel/season. Starting over.")
+        return None
+    return checkpoint
+
+class _Checkpointer:
+    """Serializes checkpoint writes from concurrent partitions (encode on the loop, write in a thread)."""
+    def __init__(self, path: str, checkpoint: Dict[str, Any]):
+        self.path = path
+        self.checkpoint = checkpoint
+        self._lock = asyncio.Lock()
+        # The write thread keeps running if its caller is cancelled; the next save waits for it,
+        # so an older state can never land on disk after a newer one
+        self._writing: Optional[asyncio.Future] = None
+
+    def _write(self, payload: str):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        storage.write_snapshot(self.path, payload)
+
+    async def save(self):
+        async with self._lock:
+            if self._writing is not None:
+                await asyncio.wait({self._writing})
+            payload = json.dumps(self.checkpoint, separators=(',', ':'))
+            self._writing = asyncio.ensure_future(asyncio.to_thread(self._write, payload))
+            await asyncio.shield(self._writing)
+
+async def _scan_partition(channel, part: Dict[str, Any], parse_game: Callable, checkpointer: _Checkpointer,
+                          progress: Optional[ScanProgress]):
+    # Both bounds are exclusive in history(): step below lo so a message whose id is exactly lo is kept
+    after = discord.Object(id=part["cursor"] or part["lo"] - 1)
+    before = discord.Object(id=part["hi"]) if part["hi"] else None
+    since_save = 0
+    scanned = 0
+
+    try:
+        async for msg in channel.history(limit=None, after=after, before=before, oldest_first=True):
+            game = parse_game(msg)
+            if game: part["games"].append(game)
+            part["cursor"] = msg.id
+            part["scanned"] += 1
+            scanned += 1
+            if progress: progress.record(game)
+
+            since_save += 1
+            if since_save >= CHECKPOINT_EVERY:
+                await checkpointer.save()
+                since_save = 0
+    finally:
+        # Counted per run (not from part["scanned"]) so resumed work isn't counted twice
+        metrics.inc("history_messages_total", scanned, source="rescan")
+        metrics.inc("api_requests_total", scanned // 100 + 1, route="channel_history")
+
+    part["done"] = True
+    await checkpointer.save()
+
+async def scan_full_history(channel, start_date: datetime, parse_game: Callable[[Any], Optional[Dict[str, Any]]],
+                            path: str, progress: Optional[ScanProgress] = None) -> List[Dict[str, Any]]:
+    """
+    Full-channel scan for /rescan.
+    The timeline since start_date is cut into RESCAN_PARTITIONS date ranges, fetched with at most
+    RESCAN_CONCURRENCY requests in flight (discord.py still handles the per-route 429s),
+    and merged back into message-id order. Progress is checkpointed to `path`, so an interrupted
+    rescan resumes where each partition left off.
+    """
+    checkpoint = _load_checkpoint(path, channel.id, start_date)
+    if checkpoint:
+        done = sum(p["done"] for p in checkpoint["partitions"])
+        logger.info(f"⏯️ Resuming rescan from checkpoint ({done}/{len(checkpoint['partitions'])} partitions done).")
+    else:
+        checkpoint = {
+            "channel_id": channel.id,
+            "start": start_date.timestamp(),
+            "partitions": _partition(start_date, discord.utils.utcnow(), CONFIG["RESCAN_PARTITIONS"])
+        }
+    checkpointer = _Checkpointer(path, checkpoint)
+    if progress:
+        progress.resume_from(sum(p["scanned"] for p in checkpoint["partitions"]),
+                             sum(len(p["games"]) for p in checkpoint["partitions"]))
+
+    semaphore = asyncio.Semaphore(max(1, CONFIG["RESCAN_CONCURRENCY"]))
+    async def run(part):
+        async with semaphore:
+            await _scan_partition(channel, part, parse_game, checkpointer, progress)
+
+    started = time.monotonic()
+    tasks = [asyncio.create_task(run(p)) for p in checkpoint["partitions"] if not p["done"]]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One partition failed (or we were cancelled): stop the rest so they don't keep
+        # writing checkpoints behind our back, then save where every partition got to
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await checkpointer.save()
+        except Exception as e:
+            logger.error(f"❌ Could not save rescan checkpoint {path}: {e}")
+        raise
+
+    metrics.observe("history_scan_seconds", time.monotonic() - started, source="rescan")
+    games = [g for p in checkpoint["partitions"] for g in p["games"]]
+    games.sort(key=lambda g: g['id'])
+    scanned = sum(p["scanned"] for p in checkpoint["partitions"])
+    logger.info(f"✅ Rescan finished: {scanned} messages, {len(games)} games.")
+    return games
+
+def clear_checkpoint(path: str):
+    """Drop the checkpoint once the rescanned data is safely committed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,363 @@
+import bisect
+import logging
+import numpy as np
+from typing import Dict, List, Any, Tuple
+
+logger = logging.getLogger("scores")
+
+class ScoreMatrix:
+    """
+    Dense games x players score matrix (NaN = did not play), kept alongside the cache.
+    Rows follow cache["games"] order; a new game appends one row (amortized O(players)).
+    Per-player prefix sums (WAR, score, games played, wins) and the head-to-head tables
+    are maintained on append, so readers never loop over games in Python: any range of
+    games is one subtraction, and game dates map to rows by binary search.
+    Each game row also carries its aggregates (mean, participants, fails, score histogram),
+    and a sorted copy of the means gives any game's difficulty rank in O(log games).
+    Players with at least `min_games` games are kept ranked by total WAR; a game only
+    re-ranks its own participants, so a leaderboard page is a slice of that ranking.
+    """
+    # Games x players arrays: name -> (fill value, dtype)
+    _GRIDS = {
+        "_scores": (np.nan, float),
+        "_cum_war": (0.0, float),
+        "_cum_score": (0.0, float),
+        "_cum_played": (0, np.int64),
+        "_cum_wins": (0, np.int64),
+    }
+    # Per-game arrays: name -> dtype
+    _SERIES = {
+        "_day_avg": float,
+        "_dates": float,
+        "_participants": np.int64,
+        "_fails": np.int64,
+    }
+    # Histogram buckets: solved in 1..6, then failed
+    HIST_BUCKETS = 7
+
+    def __init__(self, fail_penalty: int, min_games: int = 1):
+        self.fail_penalty = fail_penalty
+        self.min_games = min_games
+        self.uids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.n_games = 0
+        for name, (fill, dtype) in self._GRIDS.items():
+            setattr(self, name, np.full((64, 8), fill, dtype=dtype))
+        for name, dtype in self._SERIES.items():
+            setattr(self, name, np.zeros(64, dtype=dtype))
+        self._hist = np.zeros((64, self.HIST_BUCKETS), dtype=np.int64)
+        # Every game's mean, ascending (difficulty ranks)
+        self._sorted_avg: List[float] = []
+        # Head-to-head: _wins[i, j] = shared games where player i scored better (lower) than j;
+        # _ties is symmetric. Losses are the transpose of wins.
+        self._wins = np.zeros((8, 8), dtype=np.int64)
+        self._ties = np.zeros((8, 8), dtype=np.int64)
+        # Qualified players best first, as (-total WAR, column): ties keep join order
+        self._ranked: List[Tuple[float, int]] = []
+        self._rank_keys: Dict[int, Tuple[float, int]] = {}
+
+    @classmethod
+    def from_games(cls, games: List[Dict[str, Any]], fail_penalty: int, min_games: int = 1) -> "ScoreMatrix":
+        """Vectorized bulk build (used on load and after a rebuild)."""
+        matrix = cls(fail_penalty, min_games)
+        for game in games:
+            for uid in game['scores']:
+                if uid not in matrix.index:
+                    matrix.index[uid] = len(matrix.uids)
+                    matrix.uids.append(uid)
+
+        n_rows, n_cols = len(games), len(matrix.uids)
+        matrix._reserve(n_rows, n_cols)
+        for row, game in enumerate(games):
+            cols = [matrix.index[uid] for uid in game['scores']]
+            matrix._scores[row, cols] = list(game['scores'].values())
+        matrix._dates[:n_rows] = [game['date'] for game in games]
+        matrix.n_games = n_rows
+
+        scores = matrix.scores
+        played = ~np.isnan(scores)
+        counts = played.sum(axis=1)
+        sums = np.nansum(scores, axis=1)
+        matrix._day_avg[:n_rows] = np.divide(sums, counts, out=np.zeros(n_rows), where=counts > 0)
+        matrix._participants[:n_rows] = counts
+        matrix._fails[:n_rows] = (scores >= fail_penalty).sum(axis=1)
+        # A fail only counts as X, even if the penalty is itself 1..6 (as in append_game)
+        solved = np.where(scores < fail_penalty, scores, np.nan)
+        for bucket in range(cls.HIST_BUCKETS - 1):
+            matrix._hist[:n_rows, bucket] = (solved == bucket + 1).sum(axis=1)
+        matrix._hist[:n_rows, -1] = matrix._fails[:n_rows]
+        matrix._sorted_avg = sorted(matrix._day_avg[:n_rows].tolist())
+        matrix._cum_war[:n_rows, :n_cols] = np.nancumsum(matrix._day_avg[:n_rows, None] - scores, axis=0)
+        matrix._cum_score[:n_rows, :n_cols] = np.nancumsum(scores, axis=0)
+        matrix._cum_played[:n_rows, :n_cols] = np.cumsum(played, axis=0)
+        matrix._cum_wins[:n_rows, :n_cols] = np.cumsum(scores < fail_penalty, axis=0)
+        matrix._build_head_to_head()
+        matrix._rerank(range(n_cols))
+        return matrix
+
+    def _build_head_to_head(self):
+        """All pairs at once: one (players x games) @ (games x players) product per distinct score."""
+        scores = self.scores
+        n = len(self.uids)
+        wins, ties = np.zeros((n, n)), np.zeros((n, n))
+        for value in np.unique(scores[~np.isnan(scores)]):
+            at = (scores == value).astype(float)
+            # NaN compares False, so players who sat the game out never count
+            wins += at.T @ (scores > value).astype(float)
+            ties += at.T @ at
+        np.fill_diagonal(ties, 0)
+        self._wins[:n, :n] = wins
+        self._ties[:n, :n] = ties
+
+    def _rerank(self, cols):
+        """Moves these players to their current place in the ranking (in, out or within). O(log players) each."""
+        last = self.n_games - 1
+        for col in cols:
+            old = self._rank_keys.pop(col, None)
+            if old is not None:
+                del self._ranked[bisect.bisect_left(self._ranked, old)]
+            if last >= 0 and self._cum_played[last, col] >= self.min_games:
+                key = self._rank_keys[col] = (-float(self._cum_war[last, col]), col)
+                bisect.insort(self._ranked, key)
+
+    def _reserve(self, n_rows: int, n_cols: int):
+        """Grows the backing arrays geometrically so appends stay amortized O(players)."""
+        rows, cols = self._scores.shape
+        if n_rows <= rows and n_cols <= cols: return
+        new_rows = max(rows, 64)
+        while new_rows < n_rows: new_rows *= 2
+        new_cols = max(cols, 8)
+        while new_cols < n_cols: new_cols *= 2
+
+        for name, (fill, dtype) in self._GRIDS.items():
+            grown = np.full((new_rows, new_cols), fill, dtype=dtype)
+            grown[:rows, :cols] = getattr(self, name)
+            setattr(self, name, grown)
+        for name, dtype in self._SERIES.items():
+            grown = np.zeros(new_rows, dtype=dtype)
+            grown[:rows] = getattr(self, name)
+            setattr(self, name, grown)
+        if new_rows > rows:
+            grown = np.zeros((new_rows, self.HIST_BUCKETS), dtype=np.int64)
+            grown[:rows] = self._hist
+            self._hist = grown
+        if new_cols > cols:
+            for name in ("_wins", "_ties"):
+                grown = np.zeros((new_cols, new_cols), dtype=np.int64)
+                grown[:cols, :cols] = getattr(self, name)
+                setattr(self, name, grown)
+
+    def _column(self, uid: str) -> int:
+        col = self.index.get(uid)
+        if col is None:
+            col = self.index[uid] = len(self.uids)
+            self.uids.append(uid)
+            self._reserve(self.n_games, len(self.uids))
+            # A late joiner carries zero totals through every game before their first
+            for name in ("_cum_war", "_cum_score", "_cum_played", "_cum_wins"):
+                getattr(self, name)[:self.n_games, col] = 0
+        return col
+
+    def append_game(self, game: Dict[str, Any]):
+        cols = [self._column(uid) for uid in game['scores']]
+        row = self.n_games
+        self._reserve(row + 1, len(self.uids))
+        values = list(game['scores'].values())
+        self._scores[row, cols] = values
+        self._day_avg[row] = sum(values) / len(values) if values else 0.0
+        self._dates[row] = game['date']
+        solved = np.asarray(values, dtype=np.int64)
+        self._participants[row] = len(values)
+        self._fails[row] = int((solved >= self.fail_penalty).sum())
+        self._hist[row] = np.bincount(np.where(solved >= self.fail_penalty, self.HIST_BUCKETS, solved) - 1,
+                                      minlength=self.HIST_BUCKETS)
+        bisect.insort(self._sorted_avg, float(self._day_avg[row]))
+
+        n = len(self.uids)
+        for name in ("_cum_war", "_cum_score", "_cum_played", "_cum_wins"):
+            cum = getattr(self, name)
+            cum[row, :n] = cum[row - 1, :n] if row else 0
+        self._cum_war[row, cols] += self._day_avg[row] - self._scores[row, cols]
+        self._cum_score[row, cols] += values
+        self._cum_played[row, cols] += 1
+        self._cum_wins[row, cols] += np.asarray(values) < self.fail_penalty
+
+        # Only this game's participants can gain a head-to-head result: O(k^2) for k players
+        vals = np.asarray(values, dtype=float)
+        pairs = np.ix_(cols, cols)
+        self._wins[pairs] += vals[:, None] < vals[None, :]
+        same = vals[:, None] == vals[None, :]
+        np.fill_diagonal(same, False)
+        self._ties[pairs] += same
+        self.n_games += 1
+        self._rerank(cols)
+
+    def truncate(self, n_rows: int):
+        """
+        Drops games [n_rows:] so a corrected suffix can be appended again. Costs O(k^2) per dropped game
+        (their head-to-head results are taken back out); earlier rows and the prefix sums up to them stay as they are.
+        Players seen only in the dropped games keep their (now all-zero) column.
+        """
+        touched = set()
+        for row in range(self.n_games - 1, n_rows - 1, -1):
+            del self._sorted_avg[bisect.bisect_left(self._sorted_avg, self._day_avg[row])]
+            vals = self._scores[row, :len(self.uids)]
+            cols = np.flatnonzero(~np.isnan(vals))
+            touched.update(cols.tolist())
+            vals = vals[cols]
+            pairs = np.ix_(cols, cols)
+            self._wins[pairs] -= vals[:, None] < vals[None, :]
+            same = vals[:, None] == vals[None, :]
+            np.fill_diagonal(same, False)
+            self._ties[pairs] -= same
+        # append_game only writes its participants' cells, so the rest of each dropped row goes back to "did not play"
+        self._scores[n_rows:self.n_games] = np.nan
+        self.n_games = min(self.n_games, n_rows)
+        self._rerank(touched)
+
+    # --- Read-only views (no copies) ---
+    @property
+    def scores(self) -> np.ndarray:
+        return self._scores[:self.n_games, :len(self.uids)]
+
+    @property
+    def played(self) -> np.ndarray:
+        return ~np.isnan(self.scores)
+
+    def day_averages(self) -> np.ndarray:
+        return self._day_avg[:self.n_games]
+
+    def war_deltas(self) -> np.ndarray:
+        """Per-game WAR gained by each player (NaN where they didn't play)."""
+        return self.day_averages()[:, None] - self.scores
+
+    def cumulative_war(self) -> np.ndarray:
+        """Running WAR after each game, carried flat across missed games."""
+        return self._cum_war[:self.n_games, :len(self.uids)]
+
+    # --- Per-player totals (aligned with self.uids), read off the prefix sums ---
+    def _span(self, name: str, lo: int, hi: int) -> np.ndarray:
+        cum = getattr(self, name)
+        n = len(self.uids)
+        end = cum[hi - 1, :n] if hi > 0 else np.zeros(n, dtype=cum.dtype)
+        return end - cum[lo - 1, :n] if lo > 0 else end.copy()
+
+    def window(self, lo: int = 0, hi: int = None) -> Dict[str, np.ndarray]:
+        """games / score / wins / war per player over games [lo, hi). O(players), no game loop."""
+        hi = self.n_games if hi is None else hi
+        return {
+            "games": self._span("_cum_played", lo, hi),
+            "score": self._span("_cum_score", lo, hi),
+            "wins": self._span("_cum_wins", lo, hi),
+            "war": self._span("_cum_war", lo, hi),
+        }
+
+    def rows_between(self, since: float = None, until: float = None) -> Tuple[int, int]:
+        """Game rows [lo, hi) dated since <= date < until (timestamps). O(log games)."""
+        dates = self._dates[:self.n_games]
+        lo = int(np.searchsorted(dates, since, side='left')) if since is not None else 0
+        hi = int(np.searchsorted(dates, until, side='left')) if until is not None else self.n_games
+        return lo, max(lo, hi)
+
+    def games_played(self) -> np.ndarray:
+        return self._span("_cum_played", 0, self.n_games)
+
+    def total_scores(self) -> np.ndarray:
+        return self._span("_cum_score", 0, self.n_games)
+
+    def wins(self) -> np.ndarray:
+        return self._span("_cum_wins", 0, self.n_games)
+
+    def total_war(self) -> np.ndarray:
+        return self._span("_cum_war", 0, self.n_games)
+
+    def player_totals(self, uid: str) -> Tuple[int, int, int, float]:
+        """(games, total score, wins, total WAR) for one player. O(1)."""
+        col, last = self.index[uid], self.n_games - 1
+        if last < 0: return 0, 0, 0, 0.0
+        return (int(self._cum_played[last, col]), int(self._cum_score[last, col]),
+                int(self._cum_wins[last, col]), float(self._cum_war[last, col]))
+
+    @property
+    def n_ranked(self) -> int:
+        return len(self._ranked)
+
+    def ranked(self, start: int = 0, stop: int = None) -> List[str]:
+        """Qualified players (min_games or more) by total WAR, best first; slice [start, stop). O(stop - start)."""
+        return [self.uids[col] for _, col in self._ranked[start:stop]]
+
+    def averages(self) -> np.ndarray:
+        games = self.games_played()
+        return np.divide(self.total_scores(), games, out=np.zeros(len(self.uids)), where=games > 0)
+
+    def timeline(self, uid: str):
+        """(game indices played, cumulative WAR after each of them) for one player."""
+        col = self.index.get(uid)
+        if col is None: return np.array([], dtype=int), np.array([])
+        rows = np.flatnonzero(~np.isnan(self.scores[:, col]))
+        return rows, self.cumulative_war()[rows, col]
+
+    def war_history(self, uid: str) -> List[float]:
+        return self.timeline(uid)[1].tolist()
+
+    # --- Per-game aggregates ---
+    def difficulty_rank(self, row: int) -> int:
+        """1 = the hardest game (highest mean) so far; tied games share a rank. O(log games)."""
+        return len(self._sorted_avg) - bisect.bisect_right(self._sorted_avg, self._day_avg[row]) + 1
+
+    def game_summary(self, row: int) -> Dict[str, Any]:
+        return {
+            "row": row,
+            "date": float(self._dates[row]),
+            "mean": float(self._day_avg[row]),
+            "participants": int(self._participants[row]),
+            "fails": int(self._fails[row]),
+            "histogram": self._hist[row].tolist(),
+            "rank": self.difficulty_rank(row),
+        }
+
+    def extreme_games(self, count: int, hardest: bool = True) -> List[int]:
+        """Rows of the `count` hardest (or easiest) games by mean; earlier games win ties."""
+        avgs = self.day_averages()
+        order = np.argsort(-avgs if hardest else avgs, kind="stable")
+        return order[:count].tolist()
+
+    def head_to_head(self, uid_a: str, uid_b: str) -> Tuple[int, int, int]:
+        """(a's wins, a's losses, ties) over the games both played. O(1)."""
+        a, b = self.index.get(uid_a), self.index.get(uid_b)
+        if a is None or b is None or a == b: return 0, 0, 0
+        return int(self._wins[a, b]), int(self._wins[b, a]), int(self._ties[a, b])
+
+    def head_to_head_table(self, uids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(wins, ties) sub-tables for `uids`, in that order (row player vs column player)."""
+        cols = [self.index[uid] for uid in uids]
+        pairs = np.ix_(cols, cols)
+        return self._wins[pairs].copy(), self._ties[pairs].copy()
+
+    def standings(self) -> List[Dict[str, Any]]:
+        """Final totals for every player, best WAR first (what a closed season's archive keeps)."""
+        totals = self.window()
+        rows = [{"uid": uid, "games": int(totals["games"][col]), "score": int(totals["score"][col]),
+                 "wins": int(totals["wins"][col]), "war": float(totals["war"][col])}
+                for col, uid in enumerate(self.uids) if totals["games"][col]]
+        rows.sort(key=lambda row: row["war"], reverse=True)
+        return rows
+
+    def player_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        cache["players"] derived in bulk, value-for-value what _process_game_stats accumulates
+        game by game (WAR is summed in the same order, so even the floats match).
+        """
+        scores, cum_war = self.scores, self.cumulative_war()
+        played = ~np.isnan(scores)
+        totals, wins, games = self.total_scores(), self.wins(), played.sum(axis=0)
+        stats = {}
+        for col, uid in enumerate(self.uids):
+            rows = np.flatnonzero(played[:, col])
+            history = cum_war[rows, col].tolist()
+            stats[uid] = {
+                "scores": scores[rows, col].astype(int).tolist(), "war_history": history,
+                "total_war": history[-1] if history else 0.0,
+                "total_score": int(totals[col]), "wins": int(wins[col]), "games_played": int(games[col])
+            }
+        return stats
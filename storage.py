@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import zlib
+import struct
+import logging
+import argparse
+import tempfile
+from array import array
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+logger = logging.getLogger("storage")
+
+# --- Binary snapshot format (v1), all little-endian ---
+#   header   magic, format version, flags, players, games, score entries, last_message_id (0 = none),
+#            current_streak, cache version, meta bytes, uid table bytes, CRC32 of everything after the header
+#   meta     JSON object of any other top-level cache keys (usually empty)
+#   uids     interned player table: uid strings joined by "\n"; games refer to players by index
+#   games    id int64[games], date float64[games], streak uint32[games], offsets uint32[games + 1]
+#   scores   player index uint32[entries], score uint8[entries]; game g owns entries offsets[g]:offsets[g + 1]
+# Derived stats (cache["players"]) are not stored; the loader recomputes them from the games.
+SNAPSHOT_MAGIC = b"WRDL"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sHHIIIqIQIII")
+_PERSISTED = ("last_message_id", "games", "current_streak", "version")
+_DERIVED = ("players",)
+_GAME_KEYS = {"id", "date", "scores", "streak"}
+
+def _fsync_dir(path: str):
+    """Flushes a directory entry so a rename survives power loss (no-op where unsupported)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def encode_snapshot(cache: Dict[str, Any]) -> bytes:
+    """Serializes the cache. Call this on the thread that owns the cache so the payload is consistent."""
+    uids: List[str] = []
+    index: Dict[str, int] = {}
+    ids, dates, streaks, offsets = array('q'), array('d'), array('I'), array('I', [0])
+    players, scores = array('I'), array('B')
+
+    for game in cache["games"]:
+        if game.keys() - _GAME_KEYS:
+            raise ValueError(f"Game {game['id']} has fields the snapshot format can't store: {sorted(game.keys() - _GAME_KEYS)}")
+        ids.append(game['id'])
+        dates.append(game['date'])
+        streaks.append(game.get('streak', 0))
+        for uid, score in game['scores'].items():
+            i = index.get(uid)
+            if i is None:
+                i = index[uid] = len(uids)
+                uids.append(uid)
+            players.append(i)
+            scores.append(score)
+        offsets.append(len(players))
+
+    meta = {k: v for k, v in cache.items() if k not in _PERSISTED and k not in _DERIVED}
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode() if meta else b""
+    uid_bytes = "\n".join(uids).encode()
+    body = b"".join([meta_bytes, uid_bytes] + [_little_endian(a) for a in (ids, dates, streaks, offsets, players, scores)])
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(uids), len(ids), len(players),
+                          cache["last_message_id"] or 0, cache.get("current_streak", 0), cache.get("version", 0),
+                          len(meta_bytes), len(uid_bytes), zlib.crc32(body))
+    return header + body
+
+def decode_snapshot(payload: bytes) -> Dict[str, Any]:
+    """Inverse of encode_snapshot (without cache["players"]). Raises ValueError on damaged or unknown data."""
+    if len(payload) < _HEADER.size:
+        raise ValueError("Snapshot is truncated")
+    (magic, fmt_version, _flags, n_players, n_games, n_entries, last_id, streak, version,
+     meta_len, uid_len, crc) = _HEADER.unpack_from(payload)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a binary snapshot")
+    if fmt_version > SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot format v{fmt_version} is newer than this bot understands (v{SNAPSHOT_VERSION})")
+    body = memoryview(payload)[_HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("Snapshot checksum mismatch")
+
+    pos = 0
+    def take(typecode: str, count: int) -> List:
+        nonlocal pos
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(body[pos:pos + size])
+        if sys.byteorder == "big": values.byteswap()
+        pos += size
+        return values.tolist()
+
+    meta = json.loads(bytes(body[:meta_len])) if meta_len else {}
+    pos = meta_len
+    uids = bytes(body[pos:pos + uid_len]).decode().split("\n") if n_players else []
+    pos += uid_len
+    ids, dates, streaks = take('q', n_games), take('d', n_games), take('I', n_games)
+    offsets = take('I', n_games + 1)
+    players, scores = take('I', n_entries), take('B', n_entries)
+    if pos != len(body) or len(uids) != n_players:
+        raise ValueError("Snapshot sections don't match the header")
+
+    games = []
+    for g in range(n_games):
+        lo, hi = offsets[g], offsets[g + 1]
+        games.append({
+            'id': ids[g],
+            'date': dates[g],
+            'scores': {uids[p]: s for p, s in zip(players[lo:hi], scores[lo:hi])},
+            'streak': streaks[g]
+        })
+
+    cache = {"last_message_id": last_id or None, "games": games, "current_streak": streak, "version": version}
+    cache.update(meta)
+    return cache
+
+def write_snapshot(path: str, payload: Union[str, bytes], mode: Optional[int] = None):
+    """
+    Atomically replaces the snapshot: write to a temp file, fsync, then rename over the old one.
+    The file is private to the bot's user (0600) unless a `mode` is given.
+    """
+    # Unique temp name: an abandoned writer thread must never share a temp file with a newer one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        if mode is not None: os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb' if isinstance(payload, bytes) else 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    _fsync_dir(path)
+
+def read_snapshot(path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Returns (snapshot, "binary" | "json"), or (None, None) if there is none.
+    The file is read in one bulk read. A corrupt file is moved aside rather than lost.
+    """
+    if not os.path.exists(path): return None, None
+    try:
+        with open(path, 'rb') as f:
+            payload = f.read()
+        if payload.startswith(SNAPSHOT_MAGIC):
+            return decode_snapshot(payload), "binary"
+        return json.loads(payload), "json"
+    except Exception as e:
+        backup = f"{path}.corrupt"
+        logger.error(f"❌ Corrupt snapshot {path}: {e}. Moving it to {backup}.")
+        os.replace(path, backup)
+        return None, None
+
+def append_journal(path: str, records: List[Dict[str, Any]]):
+    """Appends one JSON line per record and fsyncs. Cost is proportional to the new records only."""
+    if not records: return
+    payload = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records).encode()
+    with open(path, 'ab+') as f:
+        # A failed earlier append can leave a fragment without its newline; never write onto it
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n": payload = b"\n" + payload
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_journal(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads all complete journal records. A torn final line (crash mid-append) is dropped
+    and cut off the file, so the next append starts on a clean line.
+    """
+    if not os.path.exists(path): return []
+    with open(path, 'rb') as f:
+        payload = f.read()
+    complete = payload.rfind(b"\n") + 1
+    tail = payload[complete:]
+    if tail.strip():
+        try:
+            # Everything but the newline made it: keep the record (append_journal adds the newline)
+            json.loads(tail)
+            complete = len(payload)
+        except ValueError:
+            logger.warning(f"⚠️ Dropping torn last record in {path}.")
+            with open(path, 'r+b') as f:
+                f.truncate(complete)
+                f.flush()
+                os.fsync(f.fileno())
+
+    records = []
+    for i, line in enumerate(payload[:complete].decode(errors="replace").splitlines()):
+        if not line.strip(): continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logger.error(f"❌ Skipping unreadable record on line {i + 1} of {path}.")
+    return records
+
+def truncate_journal(path: str):
+    """Empties the journal once its contents are folded into a snapshot."""
+    with open(path, 'w') as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+def compact(snapshot_path: str, journal_path: str, payload: bytes):
+    """Writes a fresh snapshot and then clears the journal it supersedes."""
+    write_snapshot(snapshot_path, payload)
+    truncate_journal(journal_path)
+
+def load_store(snapshot_path: str, journal_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], List[Dict[str, Any]]]:
+    """Returns (snapshot, its format, journal records written after it)."""
+    snapshot, fmt = read_snapshot(snapshot_path)
+    return snapshot, fmt, read_journal(journal_path)
+
+# --- Lossless JSON import/export (migration, debugging, external tools) ---
+def export_json(snapshot_path: str, json_path: str):
+    """Writes a snapshot (binary or JSON) out as JSON with only the persisted fields."""
+    snapshot, _ = read_snapshot(snapshot_path)
+    if snapshot is None:
+        raise FileNotFoundError(f"No readable snapshot at {snapshot_path}")
+    snapshot = {k: v for k, v in snapshot.items() if k not in _DERIVED}
+    write_snapshot(json_path, json.dumps(snapshot, separators=(',', ':')))
+
+def import_json(json_path: str, snapshot_path: str):
+    """Converts a JSON cache (any older layout, derived stats are dropped) into a binary snapshot."""
+    with open(json_path, 'r') as f:
+        cache = json.load(f)
+    cache.setdefault("last_message_id", None)
+    cache.setdefault("current_streak", max((g.get('streak', 0) for g in cache["games"]), default=0))
+    cache.setdefault("version", len(cache["games"]))
+    write_snapshot(snapshot_path, encode_snapshot(cache))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert cache snapshots between the binary and JSON formats.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="snapshot -> JSON")
+    export.add_argument("snapshot")
+    export.add_argument("json")
+    imp = sub.add_parser("import", help="JSON -> binary snapshot")
+    imp.add_argument("json")
+    imp.add_argument("snapshot")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_json(args.snapshot, args.json)
+    else:
+        import_json(args.json, args.snapshot)
+
+if __name__ == "__main__":
+    sys.exit(main())